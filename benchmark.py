@@ -0,0 +1,308 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import cv2
+import numpy as np
+
+from config import MODELO
+from cache_embeddings import CacheEmbeddings
+from comparador import Comparador
+from indice import criar_indice, gerar_base_sintetica
+from pipeline import PipelineRosto
+from deteccao import DetectorRastreado
+from captura import criar_fonte
+from quantizacao import PRECISOES
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ============================
+# Benchmark do pipeline de reconhecimento (offline)
+# ============================
+#
+# Uso:
+#   python benchmark.py                               (galerias de 100, 1k e 10k usuários)
+#   python benchmark.py --usuarios 1000 --indices flat ivf --saida bench.json
+#   python benchmark.py --usuarios 10000 --precisoes float32 int8
+#   python benchmark.py --frames gravacao.mp4         (frames gravados para a detecção)
+#   python benchmark.py --saida nova.json --comparar bench.json
+#
+# Estágios medidos:
+#   carga_cache        -> abrir o cache de embeddings e copiar para a memória (abertura do app)
+#   construcao_indice  -> montar o Comparador/índice com a galeria inteira
+#   busca              -> um rosto contra a galeria (Comparador.buscar)
+#   deteccao_completa  -> Haar no frame inteiro
+#   deteccao_rastreada -> DetectorRastreado (reduzida + janela, como no preview)
+#   recorte            -> recorte + alinhamento dos olhos de um rosto
+#   embedding          -> inferência do modelo (só com o DeepFace instalado)
+# Cada estágio traz p50/p95/p99 em ms, vazão (itens/s) e pico de memória
+# alocada durante o estágio (tracemalloc, inclui os arrays do NumPy). A saída
+# JSON tem a mesma forma entre versões para poder ser comparada com --comparar.
+
+VERSAO_RELATORIO = 1
+
+
+def _medir(funcao, repeticoes, itens_por_chamada=1):
+    """Roda ``funcao`` várias vezes e devolve o resumo de latência/vazão/memória."""
+    tracemalloc.reset_peak()
+    memoria_inicial = tracemalloc.get_traced_memory()[0]
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    pico = tracemalloc.get_traced_memory()[1] - memoria_inicial
+    tempos_ms = np.asarray(tempos) * 1000
+    return {
+        "repeticoes": repeticoes,
+        "p50_ms": round(float(np.percentile(tempos_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(tempos_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(tempos_ms, 99)), 3),
+        "media_ms": round(float(tempos_ms.mean()), 3),
+        "por_s": round(repeticoes * itens_por_chamada / max(sum(tempos), 1e-9), 1),
+        "memoria_pico_mb": round(max(pico, 0) / 2 ** 20, 2),
+    }
+
+
+def _registros_sinteticos(n_usuarios, templates, dim, semente=0):
+    base, gerar_consultas = gerar_base_sintetica(n_usuarios, dim, semente=semente)
+    rng = np.random.default_rng(semente)
+    vetores = np.repeat(base, templates, axis=0)
+    if templates > 1:
+        vetores += 0.3 * rng.standard_normal(vetores.shape, dtype=np.float32)
+    registros = [
+        {"embedding": vetores[i], "nome": f"usuario_{i // templates}", "Nível": "nivel_1",
+         "caminho": f"nivel_1/usuario_{i // templates}/{i % templates}.jpg", "id": i}
+        for i in range(len(vetores))
+    ]
+    return vetores, registros, gerar_consultas
+
+
+def _cache_sintetico(pasta, vetores, registros, precisao="float32"):
+    """Grava um cache no formato do CacheEmbeddings sem passar pelo modelo."""
+    cache = CacheEmbeddings(os.path.join(pasta, "usuarios"), pasta, MODELO, precisao)
+    entradas = {
+        r["caminho"]: {"mtime": 0, "tamanho": 0, "hash": "", "nome": r["nome"], "nivel": r["Nível"], "linha": i}
+        for i, r in enumerate(registros)
+    }
+    cache._salvar(vetores.astype(cache.dtype), entradas)
+    return cache
+
+
+def bench_galeria(n_usuarios, templates, dim, indices, consultas, repeticoes, precisoes=("float32",)):
+    linhas = []
+    vetores, registros, gerar_consultas = _registros_sinteticos(n_usuarios, templates, dim)
+    info = {"usuarios": n_usuarios, "templates": templates, "dim": dim}
+
+    for precisao in precisoes:
+        with tempfile.TemporaryDirectory() as pasta:
+            _cache_sintetico(pasta, vetores, registros, precisao)
+
+            def carregar():
+                cache = CacheEmbeddings(os.path.join(pasta, "usuarios"), pasta, MODELO, precisao)
+                cache._carregar()
+                cache.registros()
+            linhas.append(dict(estagio="carga_cache", precisao=precisao, **info, **_medir(carregar, repeticoes)))
+
+        for tipo in indices:
+            comparadores = []
+
+            def construir():
+                comparadores.append(Comparador(registros, criar_indice=lambda: criar_indice(tipo, precisao=precisao)))
+            linhas.append(dict(estagio="construcao_indice", indice=tipo, precisao=precisao, **info,
+                               **_medir(construir, repeticoes)))
+            comparador = comparadores[-1]
+            del comparadores[:-1]
+
+            fila = iter(gerar_consultas(consultas))
+            linhas.append(dict(estagio="busca", indice=tipo, precisao=precisao, **info,
+                               **_medir(lambda: comparador.buscar(next(fila), 1), consultas)))
+    return linhas
+
+
+def ler_frames(origem, limite):
+    """Frames de um vídeo, pasta de imagens ou câmera (ver captura.criar_fonte), até ``limite``."""
+    fonte = criar_fonte(origem, tempo_real=False)
+    frames = []
+    if not fonte.abrir():
+        return frames
+    try:
+        while len(frames) < limite:
+            ret, frame = fonte.ler()
+            if not ret:
+                break
+            frames.append(frame)
+    finally:
+        fonte.fechar()
+    return frames
+
+
+def frames_sinteticos(n, largura=640, altura=480, semente=0):
+    """Frames com fundo ruidoso e um "rosto" desenhado que se move devagar."""
+    rng = np.random.default_rng(semente)
+    frames = []
+    for i in range(n):
+        frame = cv2.GaussianBlur(rng.integers(0, 255, (altura, largura, 3), dtype=np.uint8), (7, 7), 0)
+        cx, cy = largura // 2 + int(40 * np.sin(i / 10)), altura // 2
+        cv2.ellipse(frame, (cx, cy), (70, 90), 0, 0, 360, (150, 170, 200), -1)
+        for dx in (-28, 28):
+            cv2.circle(frame, (cx + dx, cy - 20), 9, (40, 40, 40), -1)
+        cv2.ellipse(frame, (cx, cy + 40), (25, 8), 0, 0, 360, (60, 60, 140), -1)
+        frames.append(frame)
+    return frames
+
+
+def bench_deteccao(frames):
+    linhas = []
+    pipeline = PipelineRosto(None)
+    info = {"frames": len(frames), "resolucao": f"{frames[0].shape[1]}x{frames[0].shape[0]}"}
+
+    fila = iter(frames)
+    linhas.append(dict(estagio="deteccao_completa", **info,
+                       **_medir(lambda: pipeline.detectar(next(fila)), len(frames))))
+
+    detector = DetectorRastreado(pipeline)
+    fila = iter(frames)
+    linhas.append(dict(estagio="deteccao_rastreada", **info,
+                       **_medir(lambda: detector.detectar(next(fila)), len(frames))))
+
+    # Caixa detectada (ou o centro do frame, se a Haar não achar nada nos frames sintéticos)
+    altura, largura = frames[0].shape[:2]
+    faces = [(pipeline.detectar(f) or [(largura // 2 - 80, altura // 2 - 100, 160, 200)])[0] for f in frames]
+    pares = iter(list(zip(frames, faces)))
+    linhas.append(dict(estagio="recorte", **info, **_medir(lambda: pipeline.recortar(*next(pares)), len(frames))))
+    return linhas, [pipeline.recortar(f, face) for f, face in zip(frames, faces)]
+
+
+def bench_embedding(recortes, lote, repeticoes):
+    try:
+        from modelo import GerenciadorModelo
+        modelo = GerenciadorModelo.instancia(MODELO)
+        modelo.aguardar()
+    except Exception as e:
+        return [{"estagio": "embedding", "ignorado": f"{type(e).__name__}: {e}"}]
+    linhas = []
+    fila = iter(recortes * (repeticoes // len(recortes) + 1))
+    linhas.append(dict(estagio="embedding", modelo=MODELO, lote=1,
+                       **_medir(lambda: modelo.embed([next(fila)]), repeticoes)))
+    n_lotes = max(1, repeticoes // lote)
+    fila = iter([[recortes[(i * lote + j) % len(recortes)] for j in range(lote)] for i in range(n_lotes)])
+    linhas.append(dict(estagio="embedding", modelo=MODELO, lote=lote,
+                       **_medir(lambda: modelo.embed(next(fila)), n_lotes, lote)))
+    return linhas
+
+
+def _ambiente():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _chave(linha):
+    return tuple((k, linha.get(k)) for k in ("estagio", "indice", "precisao", "usuarios", "lote"))
+
+
+def comparar(anterior, atual):
+    """Variação (%) de p50/p95 de cada estágio em relação a um relatório anterior."""
+    antigas = {_chave(l): l for l in anterior["estagios"] if "p50_ms" in l}
+    variacoes = []
+    for linha in atual["estagios"]:
+        antiga = antigas.get(_chave(linha))
+        if antiga is None or "p50_ms" not in linha:
+            continue
+        variacoes.append({
+            **{k: v for k, v in _chave(linha) if v is not None},
+            "p50_ms": [antiga["p50_ms"], linha["p50_ms"]],
+            "p95_ms": [antiga["p95_ms"], linha["p95_ms"]],
+            "variacao_p50_pct": round(100 * (linha["p50_ms"] / max(antiga["p50_ms"], 1e-9) - 1), 1),
+        })
+    return variacoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latência, vazão e memória de cada estágio do reconhecimento.")
+    parser.add_argument("--usuarios", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--templates", type=int, default=1, help="fotos por usuário na galeria sintética")
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--indices", nargs="+", default=["flat", "ivf"])
+    parser.add_argument("--precisoes", nargs="+", default=["float32"], choices=PRECISOES,
+                        help="precisão da galeria em memória (ver quantizacao.py)")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--repeticoes", type=int, default=5, help="para carga/construção e embedding")
+    parser.add_argument("--frames", help="vídeo ou pasta de imagens (padrão: frames sintéticos)")
+    parser.add_argument("--n-frames", type=int, default=200)
+    parser.add_argument("--lote", type=int, default=8, help="tamanho do lote no embedding em lote")
+    parser.add_argument("--sem-modelo", action="store_true", help="não mede o embedding")
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo")
+    parser.add_argument("--comparar", help="relatório JSON anterior para comparar")
+    parser.add_argument("--json", action="store_true", help="relatório JSON na saída padrão")
+    args = parser.parse_args(argv)
+
+    tracemalloc.start()
+    estagios = []
+    for n in args.usuarios:
+        estagios += bench_galeria(n, args.templates, args.dim, args.indices, args.consultas, args.repeticoes,
+                                  args.precisoes)
+
+    frames = ler_frames(args.frames, args.n_frames) if args.frames else frames_sinteticos(args.n_frames)
+    if not frames:
+        print(f"Nenhum frame lido de {args.frames}")
+        return 1
+    linhas, recortes = bench_deteccao(frames)
+    estagios += linhas
+    if not args.sem_modelo:
+        estagios += bench_embedding(recortes, args.lote, max(args.repeticoes, 20))
+    tracemalloc.stop()
+
+    relatorio = {
+        "versao": VERSAO_RELATORIO,
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "ambiente": _ambiente(),
+        "parametros": vars(args),
+        "estagios": estagios,
+    }
+    if resource is not None:
+        # ru_maxrss é em KB no Linux
+        relatorio["rss_pico_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            relatorio["comparacao"] = comparar(json.load(f), relatorio)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    if args.json:
+        json.dump(relatorio, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+
+    print(f"{'estágio':<19} {'usuários':>8} {'índice':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'itens/s':>9} {'mem MB':>8}")
+    for l in estagios:
+        if "ignorado" in l:
+            print(f"{l['estagio']:<19} ignorado ({l['ignorado']})")
+            continue
+        print(f"{l['estagio']:<19} {l.get('usuarios') or '-':>8} {l.get('indice') or '-':>6} "
+              f"{l['p50_ms']:>9.3f} {l['p95_ms']:>9.3f} {l['p99_ms']:>9.3f} {l['por_s']:>9.1f} "
+              f"{l['memoria_pico_mb']:>8.2f}")
+    if "rss_pico_mb" in relatorio:
+        print(f"Pico de memória do processo: {relatorio['rss_pico_mb']} MB")
+    for v in relatorio.get("comparacao", []):
+        print(f"{v['estagio']} {v.get('usuarios', '')} {v.get('indice', '')}: "
+              f"p50 {v['p50_ms'][0]} -> {v['p50_ms'][1]} ms ({v['variacao_p50_pct']:+.1f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+import io
+import os
+import json
+import uuid
+import hashlib
+import numpy as np
+
+EXTENSOES_IMAGEM = ('.jpg', '.png', '.jpeg')
+
+# ============================
+# Cache persistente de embeddings
+# ============================
+#
+# Fotos aceitas: usuarios/<nível>/<nome>.jpg (uma foto) ou
+# usuarios/<nível>/<nome>/<n>.jpg (várias amostras do mesmo usuário).
+#
+# A matriz fica em "<cache>/<modelo>.npy" (aberta com mmap) e os metadados em
+# "<cache>/<modelo>.json". Cada foto é identificada pelo caminho relativo a
+# DB_PATH e validada por mtime + tamanho; quando esses mudam, o hash do
+# conteúdo decide se é preciso gerar o embedding novamente.
+#
+# Com ``precisao`` "float16" ou "int8" (a da galeria em memória) a matriz é
+# gravada em float16: metade do disco e da leitura na abertura. Trocar a
+# precisão não gera embeddings de novo; a matriz só é convertida.
+#
+# Com um ``catalogo`` (catalogo.CatalogoUsuarios) a lista de fotos vem dele em
+# vez de percorrer DB_PATH, e cada gravação atualiza lá a linha de cada foto.
+
+
+def hash_arquivo(caminho, bloco=1 << 20):
+    h = hashlib.sha1()
+    with open(caminho, "rb") as f:
+        for parte in iter(lambda: f.read(bloco), b""):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def listar_fotos(db_path):
+    """Percorre a base e devolve (caminho relativo, caminho, nome, nível) de cada foto."""
+    if not os.path.exists(db_path):
+        return
+    for root, dirs, files in os.walk(db_path):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.lower().endswith(EXTENSOES_IMAGEM):
+                continue
+            caminho = os.path.join(root, file)
+            rel = os.path.relpath(caminho, db_path).replace(os.sep, "/")
+            partes = rel.split("/")
+            if len(partes) >= 3:
+                nome, nivel = partes[-2], partes[-3]
+            else:
+                nome, nivel = os.path.splitext(file)[0], os.path.basename(root)
+            yield rel, caminho, nome, nivel
+
+
+class CacheEmbeddings:
+    # Mudou a forma de gerar o embedding (recorte/alinhamento)? Aumente a versão
+    # para o cache antigo ser descartado.
+    VERSAO = 2
+    COMPACTAR_FRACAO = 0.25
+    COMPACTAR_MINIMO = 256
+
+    def __init__(self, db_path, cache_path, modelo="VGG-Face", precisao="float32", catalogo=None):
+        self.db_path = db_path
+        self.cache_path = cache_path
+        self.modelo = modelo
+        self.catalogo = catalogo
+        self.dtype = np.float32 if precisao == "float32" else np.float16
+        base = modelo.lower().replace(" ", "_")
+        self.caminho_matriz = os.path.join(cache_path, f"{base}.npy")
+        self.caminho_meta = os.path.join(cache_path, f"{base}.json")
+        self.caminho_diario = os.path.join(cache_path, f"{base}.diario")
+        self.matriz = None
+        self.entradas = {}
+        self.geracao = None
+        self.diario = 0
+
+    def _carregar(self):
+        self.matriz = None
+        self.entradas = {}
+        self.geracao = None
+        self.diario = 0
+        if not (os.path.exists(self.caminho_meta) and os.path.exists(self.caminho_matriz)):
+            return
+        try:
+            with open(self.caminho_meta, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("versao") != self.VERSAO or meta.get("modelo") != self.modelo:
+                return
+            matriz = np.load(self.caminho_matriz, mmap_mode="r")
+            entradas = meta.get("entradas", {})
+            diario = self._aplicar_diario(entradas, meta.get("geracao"))
+            if any(e["linha"] >= len(matriz) for e in entradas.values()):
+                return
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Cache de embeddings inválido, recriando: {e}")
+            return
+        self.matriz = matriz
+        self.entradas = entradas
+        self.geracao = meta.get("geracao")
+        self.diario = diario
+
+    def _aplicar_diario(self, entradas, geracao):
+        """Reaplica em ``entradas`` as operações gravadas depois do JSON; devolve quantas."""
+        if not os.path.exists(self.caminho_diario):
+            return 0
+        aplicadas = fim = 0
+        with open(self.caminho_diario, "r+b") as f:
+            for linha in f:
+                try:
+                    if not linha.endswith(b"\n"):
+                        raise ValueError("linha incompleta")
+                    operacao = json.loads(linha)
+                except ValueError:
+                    # Última linha cortada por uma gravação interrompida: sai do
+                    # arquivo para a próxima operação não ser colada nela
+                    f.truncate(fim)
+                    break
+                fim += len(linha)
+                # Linhas de antes da última compactação não valem mais
+                if operacao.get("geracao") != geracao:
+                    continue
+                for rel in operacao.get("remover", ()):
+                    entradas.pop(rel, None)
+                entradas.update(operacao.get("adicionar", {}))
+                aplicadas += 1
+        return aplicadas
+
+    def _registrar(self, adicionar=None, remover=None):
+        operacao = {"geracao": self.geracao}
+        if adicionar:
+            operacao["adicionar"] = adicionar
+        if remover:
+            operacao["remover"] = remover
+        with open(self.caminho_diario, "a", encoding="utf-8") as f:
+            f.write(json.dumps(operacao, ensure_ascii=False) + "\n")
+        self.diario += 1
+
+    def _salvar_meta(self, entradas, dim):
+        """Grava o JSON com todas as entradas numa geração nova e descarta o diário."""
+        os.makedirs(self.cache_path, exist_ok=True)
+        geracao = uuid.uuid4().hex
+        tmp_meta = self.caminho_meta + ".tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"versao": self.VERSAO, "modelo": self.modelo, "dim": int(dim), "geracao": geracao,
+                       "entradas": entradas}, f, ensure_ascii=False)
+        os.replace(tmp_meta, self.caminho_meta)
+        if os.path.exists(self.caminho_diario):
+            os.remove(self.caminho_diario)
+        self.entradas = entradas
+        self.geracao = geracao
+        self.diario = 0
+
+    def _salvar(self, matriz, entradas):
+        os.makedirs(self.cache_path, exist_ok=True)
+        # Solta o mmap antigo antes de substituir o arquivo (necessário no Windows)
+        self.matriz = None
+        tmp_matriz = self.caminho_matriz + ".tmp.npy"
+        np.save(tmp_matriz, matriz)
+        os.replace(tmp_matriz, self.caminho_matriz)
+        self._salvar_meta(entradas, matriz.shape[1])
+        self.matriz = np.load(self.caminho_matriz, mmap_mode="r")
+        if self.catalogo is not None:
+            self.catalogo.definir_linhas({rel: e["linha"] for rel, e in entradas.items()}, todas=True)
+
+    def _anexar_matriz(self, vetores):
+        """Acrescenta ``vetores`` no fim do .npy e devolve a linha do primeiro; None se o
+        arquivo não der para estender no lugar (dtype/dimensão diferentes, cabeçalho sem folga)."""
+        vetores = np.ascontiguousarray(vetores, dtype=self.dtype)
+        self.matriz = None
+        try:
+            with open(self.caminho_matriz, "r+b") as f:
+                if np.lib.format.read_magic(f) != (1, 0):
+                    return None
+                forma, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+                inicio = f.tell()
+                if fortran or dtype != self.dtype or len(forma) != 2 or forma[1] != vetores.shape[1]:
+                    return None
+                cabecalho = io.BytesIO()
+                np.lib.format.write_array_header_1_0(cabecalho, {
+                    "descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                    "shape": (forma[0] + len(vetores), forma[1])})
+                if cabecalho.tell() != inicio:
+                    return None
+                # Descarta o que uma gravação interrompida deixou depois da última linha
+                f.seek(inicio + forma[0] * forma[1] * dtype.itemsize)
+                f.truncate()
+                f.write(vetores.tobytes())
+                f.flush()
+                # O cabeçalho só muda depois dos dados: uma queda aqui deixa a matriz antiga
+                f.seek(0)
+                f.write(cabecalho.getvalue())
+            return forma[0]
+        finally:
+            self.matriz = np.load(self.caminho_matriz, mmap_mode="r")
+
+    def _anexar(self, novas):
+        """Inclui ``[(rel, meta, vetor)]`` gravando só as linhas novas e uma linha no diário."""
+        primeira = None
+        if self.matriz is not None and self.matriz.dtype == self.dtype:
+            primeira = self._anexar_matriz(np.vstack([vetor for _, _, vetor in novas]))
+        if primeira is None:
+            rels = {rel for rel, _, _ in novas}
+            self._reescrever({r: m for r, m in self.entradas.items() if r not in rels}, novas)
+            return
+        adicionadas = {rel: dict(meta, linha=primeira + i) for i, (rel, meta, _) in enumerate(novas)}
+        self._registrar(adicionar=adicionadas)
+        self.entradas.update(adicionadas)
+        if self.catalogo is not None:
+            self.catalogo.definir_linhas({rel: e["linha"] for rel, e in adicionadas.items()})
+
+    def _mortas(self):
+        return len(self.matriz) - len(self.entradas) if self.matriz is not None else 0
+
+    def _compactar_se_preciso(self):
+        if self._mortas() > max(self.COMPACTAR_MINIMO, self.COMPACTAR_FRACAO * len(self.matriz)):
+            self._reescrever(dict(self.entradas), [])
+
+    def _meta_arquivo(self, caminho):
+        st = os.stat(caminho)
+        return {"mtime": st.st_mtime_ns, "tamanho": st.st_size}
+
+    def _reescrever(self, mantidas, novas):
+        """Grava o cache com as linhas mantidas (``{rel: meta}`` com a linha antiga)
+        seguidas das novas (``[(rel, meta, vetor)]``)."""
+        linhas = [meta["linha"] for meta in mantidas.values()]
+        partes = []
+        if linhas:
+            partes.append(np.asarray(self.matriz[linhas], dtype=self.dtype))
+        if novas:
+            partes.append(np.vstack([vetor for _, _, vetor in novas]).astype(self.dtype))
+        if partes:
+            matriz = np.vstack(partes)
+        else:
+            dim = self.matriz.shape[1] if self.matriz is not None else 0
+            matriz = np.zeros((0, dim), dtype=self.dtype)
+
+        entradas = {}
+        for i, (rel, meta) in enumerate(mantidas.items()):
+            entradas[rel] = dict(meta, linha=i)
+        for i, (rel, meta, _) in enumerate(novas):
+            entradas[rel] = dict(meta, linha=len(mantidas) + i)
+        self._salvar(matriz, entradas)
+
+    def sincronizar(self, gerar_embedding):
+        """Atualiza o cache com a base em disco e devolve os registros.
+
+        Só chama ``gerar_embedding(caminho)`` para fotos novas ou alteradas;
+        entradas de arquivos que não existem mais são descartadas.
+        """
+        self._carregar()
+        antigas = self.entradas
+        mantidas = {}
+        novas = []
+        faltando = []
+        alterado = False
+
+        fotos = self.catalogo.todas_fotos() if self.catalogo is not None else listar_fotos(self.db_path)
+        for rel, caminho, nome, nivel in fotos:
+            antiga = antigas.get(rel)
+            try:
+                meta = dict(self._meta_arquivo(caminho), nome=nome, nivel=nivel)
+            except FileNotFoundError:
+                # Só acontece com o catálogo: a foto foi apagada fora do app
+                print(f"Foto não encontrada, saindo do catálogo: {caminho}")
+                faltando.append(caminho)
+                continue
+            if antiga and antiga["mtime"] == meta["mtime"] and antiga["tamanho"] == meta["tamanho"]:
+                meta["hash"] = antiga["hash"]
+            else:
+                meta["hash"] = hash_arquivo(caminho)
+                alterado = True
+
+            if antiga and antiga["hash"] == meta["hash"]:
+                mantidas[rel] = dict(meta, linha=antiga["linha"])
+                continue
+            try:
+                vetor = np.asarray(gerar_embedding(caminho), dtype=np.float32)
+            except Exception as e:
+                print(f"Erro ao processar {caminho}: {e}")
+                continue
+            novas.append((rel, meta, vetor))
+
+        if novas or len(mantidas) != len(antigas):
+            alterado = True
+        if faltando:
+            self.catalogo.remover_fotos(faltando)
+        mortas = len(self.matriz) - len(mantidas) if self.matriz is not None else 0
+        if (self.matriz is None or self.matriz.dtype != self.dtype
+                or mortas > max(self.COMPACTAR_MINIMO, self.COMPACTAR_FRACAO * len(self.matriz))):
+            self._reescrever(mantidas, novas)
+            return self.registros()
+
+        self.entradas = mantidas
+        if novas:
+            self._anexar(novas)
+        if alterado or self.diario:
+            # Só o JSON: junta o diário e as mudanças de mtime, sem tocar na matriz
+            self._salvar_meta(self.entradas, self.matriz.shape[1])
+        if self.catalogo is not None:
+            # Catálogo recém-montado (ou refeito) ainda não sabe as linhas
+            self.catalogo.definir_linhas({rel: e["linha"] for rel, e in self.entradas.items()}, todas=True)
+        return self.registros()
+
+    def adicionar(self, caminho, nome, nivel, vetor):
+        """Inclui (ou substitui) uma única foto sem percorrer a base."""
+        return self.adicionar_lote([(caminho, nome, nivel, vetor)])[0]
+
+    def adicionar_lote(self, itens):
+        """Inclui várias fotos ``(caminho, nome, nível, vetor)`` gravando o cache uma vez só."""
+        if self.matriz is None:
+            self._carregar()
+        novas = {}
+        for caminho, nome, nivel, vetor in itens:
+            rel = os.path.relpath(caminho, self.db_path).replace(os.sep, "/")
+            meta = dict(self._meta_arquivo(caminho), nome=nome, nivel=nivel, hash=hash_arquivo(caminho))
+            novas[rel] = (rel, meta, np.asarray(vetor, dtype=np.float32))
+        if novas:
+            self._anexar(list(novas.values()))
+            self._compactar_se_preciso()
+        return [self._registro(rel, meta, vetor[np.newaxis], linha=0) for rel, meta, vetor in novas.values()]
+
+    def remover(self, caminhos):
+        """Descarta as entradas das fotos indicadas (as linhas ficam mortas até a compactação)."""
+        if self.matriz is None:
+            self._carregar()
+        rels = {os.path.relpath(c, self.db_path).replace(os.sep, "/") for c in caminhos}
+        rels = sorted(r for r in rels if r in self.entradas)
+        if not rels:
+            return
+        self._registrar(remover=rels)
+        for rel in rels:
+            del self.entradas[rel]
+        if self.catalogo is not None:
+            self.catalogo.definir_linhas({rel: None for rel in rels})
+        self._compactar_se_preciso()
+
+    def _registro(self, rel, meta, matriz, linha=None):
+        linha = meta["linha"] if linha is None else linha
+        return {"embedding": matriz[linha], "nome": meta["nome"],
+                "Nível": meta["nivel"], "caminho": os.path.normpath(os.path.join(self.db_path, rel))}
+
+    def registros(self):
+        """Lista no formato usado pelo FaceApp: embedding, nome e Nível."""
+        if self.matriz is None:
+            return []
+        # Copia a matriz para a memória de uma vez só, liberando o mmap
+        matriz = np.array(self.matriz, dtype=np.float32)
+        return [self._registro(rel, meta, matriz) for rel, meta in self.entradas.items()]
@@ -0,0 +1,397 @@
+import os
+import time
+import asyncio
+import threading
+import cv2
+
+from metricas import METRICAS
+
+# ============================
+# Fontes de vídeo compartilhadas
+# ============================
+#
+# Uma FonteVideo por origem no processo: uma thread lê o dispositivo e guarda
+# só o frame mais recente; cada consumidor (cadastro, login, preview...) pega
+# os frames por uma Assinatura. Frames que um consumidor não chegou a ler
+# contam como descartados para ele, então ninguém acumula fila nem atrasa os
+# outros.
+#
+# Quando o último consumidor sai, a câmera continua aberta por ``ociosa``
+# segundos: um login logo depois de outro (ou depois do cadastro) não paga o
+# tempo de abrir/aquecer a câmera de novo.
+#
+# Origens aceitas (criar_fonte):
+#   0, 1, "0"            -> webcam
+#   "video.mp4"          -> arquivo, no ritmo do FPS original
+#   "pasta/"             -> imagens da pasta em ordem alfabética (fps fixo)
+#   "rtsp://...", "http://..." -> stream de rede, reconectando se cair
+#   "simulado:video.mp4" -> arquivo em loop no ritmo real, fazendo papel de uma
+#                           câmera de rede local (testes sem hardware)
+
+EXTENSOES_IMAGEM = ('.jpg', '.png', '.jpeg', '.bmp')
+PREFIXOS_STREAM = ("rtsp://", "rtsps://", "http://", "https://", "udp://", "tcp://")
+
+
+class FonteCamera:
+    finita = False
+    intervalo = 0  # cap.read() já bloqueia no ritmo da câmera
+
+    def __init__(self, indice=0):
+        self.indice = indice
+        self.cap = None
+
+    def abrir(self):
+        self.cap = cv2.VideoCapture(self.indice)
+        return self.cap.isOpened()
+
+    def ler(self):
+        return self.cap.read()
+
+    def fechar(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+class FonteArquivo(FonteCamera):
+    def __init__(self, caminho, tempo_real=True, repetir=False):
+        super().__init__(caminho)
+        self.tempo_real = tempo_real
+        self.repetir = repetir
+        self.finita = not repetir
+
+    def abrir(self):
+        if not super().abrir():
+            return False
+        # Arquivos são lidos no ritmo do FPS original, como se fossem uma câmera
+        if self.tempo_real:
+            fps = self.cap.get(cv2.CAP_PROP_FPS)
+            self.intervalo = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+        return True
+
+    def ler(self):
+        ret, frame = self.cap.read()
+        if not ret and self.repetir:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+
+class FontePasta:
+    def __init__(self, pasta, fps=10, tempo_real=True, repetir=False):
+        self.pasta = pasta
+        self.intervalo = 1.0 / fps if tempo_real else 0
+        self.repetir = repetir
+        self.finita = not repetir
+        self.arquivos = []
+        self._posicao = 0
+
+    def abrir(self):
+        self.arquivos = [
+            os.path.join(self.pasta, f) for f in sorted(os.listdir(self.pasta))
+            if f.lower().endswith(EXTENSOES_IMAGEM)
+        ]
+        return bool(self.arquivos)
+
+    def ler(self):
+        if self._posicao >= len(self.arquivos):
+            if not self.repetir:
+                return False, None
+            self._posicao = 0
+        frame = cv2.imread(self.arquivos[self._posicao])
+        self._posicao += 1
+        return frame is not None, frame
+
+    def fechar(self):
+        pass
+
+
+class FonteStream(FonteCamera):
+    """Stream de rede: se a leitura falhar, fecha e reabre depois de ``espera_reconexao``."""
+
+    def __init__(self, url, espera_reconexao=1.0):
+        super().__init__(url)
+        self.espera_reconexao = espera_reconexao
+
+    def ler(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.release()
+            time.sleep(self.espera_reconexao)
+            self.cap = cv2.VideoCapture(self.indice)
+        return ret, frame
+
+
+def criar_fonte(origem, tempo_real=True):
+    if isinstance(origem, int) or (isinstance(origem, str) and origem.isdigit()):
+        return FonteCamera(int(origem))
+    if origem.startswith("simulado:"):
+        return FonteArquivo(origem[len("simulado:"):], tempo_real=True, repetir=True)
+    if origem.lower().startswith(PREFIXOS_STREAM):
+        return FonteStream(origem)
+    if os.path.isdir(origem):
+        return FontePasta(origem, tempo_real=tempo_real)
+    return FonteArquivo(origem, tempo_real=tempo_real)
+
+
+class FonteVideo:
+    _fontes = {}
+    _lock_fontes = threading.Lock()
+
+    @classmethod
+    def compartilhada(cls, origem=0, tempo_real=True, ociosa=60.0):
+        """Fonte já aberta para ``origem`` ou uma nova (que só fica registrada se abrir)."""
+        chave = (str(origem), tempo_real)
+        with cls._lock_fontes:
+            fonte = cls._fontes.get(chave)
+            if fonte is None or fonte.encerrada:
+                fonte = cls(criar_fonte(origem, tempo_real), ociosa)
+                if fonte.aberta():
+                    cls._fontes[chave] = fonte
+                    fonte._chave = chave
+            return fonte
+
+    @classmethod
+    def assinar_origem(cls, origem=0, tempo_real=True, ociosa=60.0):
+        """Assinatura da fonte compartilhada de ``origem``; None se não abrir."""
+        for _ in range(2):
+            fonte = cls.compartilhada(origem, tempo_real, ociosa)
+            if not fonte.aberta():
+                return None
+            try:
+                return fonte.assinar()
+            except RuntimeError:
+                # Fechou por ociosidade entre achar e assinar: abre outra
+                continue
+        return None
+
+    def __init__(self, backend, ociosa=60.0):
+        self.backend = backend
+        self.ociosa = ociosa
+        self._chave = None
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._consumidores = 0
+        self._sem_consumidores_desde = time.monotonic()
+        self._thread = None
+        self.lidos = 0
+        self.falhas = 0
+        self.encerrada = False
+        self._aberta = backend.abrir()
+        if not self._aberta:
+            backend.fechar()
+            self.encerrada = True
+
+    def aberta(self):
+        return self._aberta
+
+    def assinar(self):
+        with self._cond:
+            if self.encerrada:
+                raise RuntimeError("Fonte de vídeo encerrada")
+            self._consumidores += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._ler, name="fonte-video", daemon=True)
+                self._thread.start()
+            return Assinatura(self)
+
+    def _sair(self):
+        with self._cond:
+            self._consumidores -= 1
+            if self._consumidores == 0:
+                self._sem_consumidores_desde = time.monotonic()
+
+    def _continuar(self):
+        # Decide e marca como encerrada de uma vez, para ninguém assinar no meio
+        with self._cond:
+            if (self._consumidores == 0 and self.ociosa is not None
+                    and time.monotonic() - self._sem_consumidores_desde >= self.ociosa):
+                self.encerrada = True
+            return not self.encerrada
+
+    def _ler(self):
+        proximo = time.perf_counter()
+        try:
+            while self._continuar():
+                inicio = time.perf_counter()
+                ret, frame = self.backend.ler()
+                if not ret:
+                    if self.backend.finita:
+                        break
+                    self.falhas += 1
+                    METRICAS.contar("falhas_camera")
+                    time.sleep(0.01)
+                    continue
+                instante = time.monotonic()
+                METRICAS.registrar("captura", time.perf_counter() - inicio)
+                METRICAS.contar("frames_lidos")
+                with self._cond:
+                    self._seq += 1
+                    self.lidos += 1
+                    self._item = (self._seq, instante, frame)
+                    self._cond.notify_all()
+                if self.backend.intervalo:
+                    proximo += self.backend.intervalo
+                    espera = proximo - time.perf_counter()
+                    if espera > 0:
+                        time.sleep(espera)
+                    else:
+                        proximo = time.perf_counter()
+        finally:
+            self.fechar()
+
+    def fechar(self):
+        with FonteVideo._lock_fontes:
+            if FonteVideo._fontes.get(self._chave) is self:
+                del FonteVideo._fontes[self._chave]
+        with self._cond:
+            if self.encerrada and self._thread is None:
+                return
+            self.encerrada = True
+            self._cond.notify_all()
+        if self._thread is None or threading.current_thread() is self._thread:
+            self.backend.fechar()
+
+
+class Assinatura:
+    """Um consumidor da FonteVideo: recebe sempre o frame mais novo ainda não visto."""
+
+    def __init__(self, fonte):
+        self.fonte = fonte
+        self._visto = fonte._seq
+        self.recebidos = 0
+        self.descartados = 0
+        self.fechada = False
+
+    def proximo(self, timeout=None):
+        """(seq, instante, frame) do próximo frame novo; None se acabou ou deu timeout."""
+        fonte = self.fonte
+        with fonte._cond:
+            fonte._cond.wait_for(lambda: fonte._seq > self._visto or fonte.encerrada or self.fechada, timeout)
+            if self.fechada or fonte._item is None or fonte._item[0] <= self._visto:
+                return None
+            seq = fonte._item[0]
+            perdidos = seq - self._visto - 1
+            self._visto = seq
+            item = fonte._item
+        if perdidos > 0 and self.recebidos:
+            self.descartados += perdidos
+            METRICAS.contar("frames_descartados", perdidos)
+        self.recebidos += 1
+        return item
+
+    def encerrada(self):
+        return self.fechada or (self.fonte.encerrada and self.fonte._seq <= self._visto)
+
+    def __iter__(self):
+        while True:
+            item = self.proximo()
+            if item is None:
+                return
+            yield item
+
+    async def frames(self):
+        """Gerador assíncrono de (seq, instante, frame)."""
+        while True:
+            item = await asyncio.to_thread(self.proximo, 0.5)
+            if item is not None:
+                yield item
+            elif self.encerrada():
+                return
+
+    def fechar(self):
+        if self.fechada:
+            return
+        with self.fonte._cond:
+            self.fechada = True
+            self.fonte._cond.notify_all()
+        self.fonte._sair()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+# ============================
+# Captura com processamento em thread própria
+# ============================
+#
+# Consumidor da FonteVideo usado no login: ``processar(frame)`` (ex.: detecção
+# de rosto) roda nesta thread e o resultado acompanha o frame. A interface
+# pega só o mais recente com ultimo(); frames processados que foram
+# substituídos antes de serem lidos também contam como descartados.
+
+
+class CapturaThread(threading.Thread):
+    def __init__(self, fonte=0, processar=None, tempo_real=True, ociosa=60.0):
+        super().__init__(daemon=True)
+        self.processar = processar
+        self.assinatura = FonteVideo.assinar_origem(fonte, tempo_real, ociosa)
+
+        self._cond = threading.Condition()
+        self._parar = threading.Event()
+        self._item = None
+        self._seq = 0
+        self._seq_entregue = 0
+        self.lidos = 0
+        self.descartados = 0
+        self.encerrada = False
+
+    def aberta(self):
+        return self.assinatura is not None
+
+    def run(self):
+        try:
+            while self.assinatura and not self._parar.is_set():
+                item = self.assinatura.proximo(timeout=0.1)
+                if item is None:
+                    if self.assinatura.encerrada():
+                        break
+                    continue
+                _, _, frame = item
+                extra = self.processar(frame) if self.processar else None
+                with self._cond:
+                    # Sem ninguém lendo com ultimo() (ex.: portas.py) nada conta como descartado
+                    if self._seq_entregue and self._seq > self._seq_entregue:
+                        self.descartados += 1
+                        METRICAS.contar("frames_descartados")
+                    self._seq += 1
+                    self.lidos += 1
+                    self._item = (self._seq, frame, extra)
+                    self._cond.notify_all()
+        finally:
+            if self.assinatura:
+                self.assinatura.fechar()
+            with self._cond:
+                self.encerrada = True
+                self._cond.notify_all()
+
+    def ultimo(self, apos=0, timeout=None):
+        """Devolve (seq, frame, extra) do frame mais novo com seq > ``apos``.
+
+        Sem ``timeout`` não bloqueia; devolve None se não houver frame novo.
+        """
+        with self._cond:
+            if timeout:
+                self._cond.wait_for(lambda: self._seq > apos or self.encerrada, timeout)
+            if self._item is None or self._item[0] <= apos:
+                return None
+            self._seq_entregue = self._item[0]
+            return self._item
+
+    def parar(self, timeout=1.0):
+        self._parar.set()
+        if not self.is_alive():
+            if self.assinatura:
+                self.assinatura.fechar()
+            return
+        if threading.current_thread() is not self:
+            self.join(timeout)
+
+    def estatisticas(self):
+        with self._cond:
+            descartados = self.descartados + (self.assinatura.descartados if self.assinatura else 0)
+            falhas = self.assinatura.fonte.falhas if self.assinatura else 0
+            return {"lidos": self.lidos, "descartados": descartados, "falhas": falhas}
@@ -0,0 +1,241 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+
+from config import DB_PATH
+from cache_embeddings import listar_fotos
+
+# ============================
+# Catálogo de usuários (SQLite)
+# ============================
+#
+# Um arquivo "<DB_PATH>/catalogo.sqlite3" com cada usuário (nome, nível,
+# criado/atualizado) e cada foto dele (caminho relativo a DB_PATH e a linha
+# do embedding na matriz do cache). Listar, contar, paginar e achar um
+# usuário são consultas indexadas; ninguém mais percorre as pastas.
+#
+# O catálogo é montado a partir das pastas uma única vez, quando o arquivo
+# ainda não existe. Daí em diante cadastro, remoção e importar_usuarios.py o
+# mantêm em dia. Fotos colocadas à mão em usuarios/ só entram com:
+#   python catalogo.py --reconstruir
+#
+# Consultas:
+#   python catalogo.py                         (contagem por nível)
+#   python catalogo.py --nivel nivel_1 --pagina 2 --por-pagina 50
+
+ARQUIVO_CATALOGO = "catalogo.sqlite3"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    nivel TEXT NOT NULL,
+    criado REAL NOT NULL,
+    atualizado REAL NOT NULL,
+    UNIQUE (nivel, nome)
+);
+CREATE TABLE IF NOT EXISTS fotos (
+    id INTEGER PRIMARY KEY,
+    usuario INTEGER NOT NULL REFERENCES usuarios (id) ON DELETE CASCADE,
+    caminho TEXT NOT NULL UNIQUE,
+    linha INTEGER,
+    criado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fotos_usuario ON fotos (usuario);
+CREATE TABLE IF NOT EXISTS info (chave TEXT PRIMARY KEY, valor TEXT);
+"""
+
+
+class CatalogoUsuarios:
+    def __init__(self, db_path=DB_PATH, caminho=None, montar=True):
+        # montar=False: não monta o catálogo novo a partir das pastas (quem chama
+        # vai chamar reconstruir() logo em seguida)
+        self.db_path = db_path
+        os.makedirs(db_path, exist_ok=True)
+        self.caminho = caminho or os.path.join(db_path, ARQUIVO_CATALOGO)
+        # Uma conexão para o processo; o lock serializa o uso entre threads
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA foreign_keys = ON")
+        self._conexao.execute("PRAGMA journal_mode = WAL")
+        with self._lock, self._conexao:
+            self._conexao.executescript(ESQUEMA)
+            montado = self._conexao.execute("SELECT valor FROM info WHERE chave = 'montado'").fetchone()
+        if montado is None and montar:
+            self.reconstruir()
+
+    def _rel(self, caminho):
+        return os.path.relpath(caminho, self.db_path).replace(os.sep, "/")
+
+    def _abs(self, rel):
+        return os.path.normpath(os.path.join(self.db_path, rel))
+
+    def _id_usuario(self, nome, nivel, agora):
+        self._conexao.execute(
+            "INSERT INTO usuarios (nome, nivel, criado, atualizado) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (nivel, nome) DO UPDATE SET atualizado = excluded.atualizado",
+            (nome, nivel, agora, agora))
+        return self._conexao.execute("SELECT id FROM usuarios WHERE nivel = ? AND nome = ?",
+                                     (nivel, nome)).fetchone()[0]
+
+    def reconstruir(self):
+        """Refaz o catálogo a partir das fotos em DB_PATH; devolve quantos usuários achou.
+
+        As linhas dos embeddings voltam na próxima gravação do cache.
+        """
+        fotos = list(listar_fotos(self.db_path))
+        agora = time.time()
+        with self._lock, self._conexao:
+            self._conexao.execute("DELETE FROM usuarios")
+            for rel, _, nome, nivel in fotos:
+                usuario = self._id_usuario(nome, nivel, agora)
+                self._conexao.execute("INSERT OR REPLACE INTO fotos (usuario, caminho, criado) VALUES (?, ?, ?)",
+                                      (usuario, rel, agora))
+            self._conexao.execute("INSERT OR REPLACE INTO info (chave, valor) VALUES ('montado', ?)",
+                                  (str(agora),))
+            return self._conexao.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+
+    # ---- alterações ----
+
+    def adicionar_fotos(self, itens, substituir=False):
+        """Inclui fotos ``(nome, nível, caminho)`` numa transação só.
+
+        Com ``substituir`` as fotos que cada usuário já tinha saem do catálogo.
+        """
+        itens = list(itens)
+        agora = time.time()
+        with self._lock, self._conexao:
+            ids = {}
+            for nome, nivel, _ in itens:
+                if (nome, nivel) not in ids:
+                    ids[nome, nivel] = self._id_usuario(nome, nivel, agora)
+                    if substituir:
+                        self._conexao.execute("DELETE FROM fotos WHERE usuario = ?", (ids[nome, nivel],))
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO fotos (usuario, caminho, criado) VALUES (?, ?, ?)",
+                [(ids[nome, nivel], self._rel(caminho), agora) for nome, nivel, caminho in itens])
+            self._apagar_sem_fotos()
+
+    def adicionar(self, nome, nivel, caminhos, substituir=False):
+        self.adicionar_fotos(((nome, nivel, c) for c in caminhos), substituir)
+
+    def remover(self, nome, nivel):
+        """Tira o usuário do catálogo; devolve os caminhos das fotos que ele tinha."""
+        with self._lock, self._conexao:
+            linha = self._conexao.execute("SELECT id FROM usuarios WHERE nivel = ? AND nome = ?",
+                                          (nivel, nome)).fetchone()
+            if linha is None:
+                return []
+            fotos = self._conexao.execute("SELECT caminho FROM fotos WHERE usuario = ? ORDER BY caminho",
+                                          linha).fetchall()
+            self._conexao.execute("DELETE FROM usuarios WHERE id = ?", linha)
+        return [self._abs(rel) for rel, in fotos]
+
+    def remover_fotos(self, caminhos):
+        """Tira fotos avulsas (ex.: apagadas à mão); usuários sem foto nenhuma saem junto."""
+        with self._lock, self._conexao:
+            self._conexao.executemany("DELETE FROM fotos WHERE caminho = ?", [(self._rel(c),) for c in caminhos])
+            self._apagar_sem_fotos()
+
+    def _apagar_sem_fotos(self):
+        self._conexao.execute("DELETE FROM usuarios WHERE id NOT IN (SELECT usuario FROM fotos)")
+
+    def definir_linhas(self, linhas, todas=False):
+        """Grava a linha da matriz de embeddings das fotos indicadas (``{caminho relativo: linha}``).
+
+        Com ``todas`` o mapa é completo: fotos fora dele ficam sem linha.
+        """
+        with self._lock, self._conexao:
+            if todas:
+                self._conexao.execute("UPDATE fotos SET linha = NULL")
+            self._conexao.executemany("UPDATE fotos SET linha = ? WHERE caminho = ?",
+                                      [(linha, rel) for rel, linha in linhas.items()])
+
+    # ---- consultas ----
+
+    def obter(self, nome, nivel):
+        """Usuário com as fotos e as linhas dos embeddings; None se não existir."""
+        with self._lock:
+            usuario = self._conexao.execute(
+                "SELECT id, criado, atualizado FROM usuarios WHERE nivel = ? AND nome = ?", (nivel, nome)).fetchone()
+            if usuario is None:
+                return None
+            fotos = self._conexao.execute("SELECT caminho, linha FROM fotos WHERE usuario = ? ORDER BY caminho",
+                                          usuario[:1]).fetchall()
+        return {"nome": nome, "nivel": nivel, "criado": usuario[1], "atualizado": usuario[2],
+                "fotos": [self._abs(rel) for rel, _ in fotos], "linhas": [linha for _, linha in fotos]}
+
+    def fotos(self, nome, nivel):
+        usuario = self.obter(nome, nivel)
+        return usuario["fotos"] if usuario else []
+
+    def todas_fotos(self):
+        """(caminho relativo, caminho, nome, nível) de cada foto, como cache_embeddings.listar_fotos."""
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT f.caminho, u.nome, u.nivel FROM fotos f JOIN usuarios u ON u.id = f.usuario "
+                "ORDER BY f.caminho").fetchall()
+        return [(rel, self._abs(rel), nome, nivel) for rel, nome, nivel in linhas]
+
+    def usuarios(self, nivel=None, limite=None, deslocamento=0):
+        """Nomes do nível em ordem alfabética (ou pares (nome, nível) de todos), paginados."""
+        paginacao = " LIMIT ? OFFSET ?"
+        pagina = (-1 if limite is None else limite, deslocamento)
+        with self._lock:
+            if nivel is not None:
+                linhas = self._conexao.execute(
+                    "SELECT nome FROM usuarios WHERE nivel = ? ORDER BY nome" + paginacao, (nivel,) + pagina)
+                return [nome for nome, in linhas]
+            linhas = self._conexao.execute("SELECT nome, nivel FROM usuarios ORDER BY nivel, nome" + paginacao,
+                                           pagina)
+            return [tuple(linha) for linha in linhas]
+
+    def contar(self, nivel=None):
+        with self._lock:
+            if nivel is not None:
+                return self._conexao.execute("SELECT COUNT(*) FROM usuarios WHERE nivel = ?", (nivel,)).fetchone()[0]
+            return self._conexao.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+
+    def contagem_por_nivel(self):
+        with self._lock:
+            return dict(self._conexao.execute("SELECT nivel, COUNT(*) FROM usuarios GROUP BY nivel ORDER BY nivel"))
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catálogo de usuários (SQLite).")
+    parser.add_argument("--db", default=DB_PATH, help="pasta dos usuários")
+    parser.add_argument("--reconstruir", action="store_true", help="refaz o catálogo a partir das pastas")
+    parser.add_argument("--nivel", help="lista os usuários deste nível")
+    parser.add_argument("--pagina", type=int, default=1)
+    parser.add_argument("--por-pagina", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    # Com --reconstruir as pastas são percorridas uma vez só, aqui
+    catalogo = CatalogoUsuarios(args.db, montar=not args.reconstruir)
+    if args.reconstruir:
+        inicio = time.perf_counter()
+        total = catalogo.reconstruir()
+        print(f"Catálogo refeito: {total} usuários em {time.perf_counter() - inicio:.2f} s")
+    if args.nivel:
+        total = catalogo.contar(args.nivel)
+        nomes = catalogo.usuarios(args.nivel, args.por_pagina, (args.pagina - 1) * args.por_pagina)
+        for nome in nomes:
+            print(nome)
+        print(f"Página {args.pagina} ({len(nomes)} de {total} usuários no {args.nivel})")
+    else:
+        for nivel, total in catalogo.contagem_por_nivel().items():
+            print(f"{nivel:<12} {total:>8}")
+        print(f"{'total':<12} {catalogo.contar():>8}")
+    catalogo.fechar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import json
+import time
+import base64
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import cv2
+import numpy as np
+
+# ============================
+# Cliente do servidor de reconhecimento
+# ============================
+#
+# Mesma interface de servico.ServicoReconhecimento, mas falando com
+# servidor.py por HTTP/JSON. As imagens vão em JPEG (base64); quando a caixa
+# do rosto já é conhecida, só a região em volta dela é enviada.
+
+QUALIDADE_JPEG = 90
+
+
+def codificar_imagem(imagem):
+    ok, dados = cv2.imencode(".jpg", imagem, [cv2.IMWRITE_JPEG_QUALITY, QUALIDADE_JPEG])
+    if not ok:
+        raise ValueError("Imagem não pôde ser codificada")
+    return base64.b64encode(dados.tobytes()).decode("ascii")
+
+
+def decodificar_imagem(texto):
+    dados = np.frombuffer(base64.b64decode(texto), dtype=np.uint8)
+    imagem = cv2.imdecode(dados, cv2.IMREAD_COLOR)
+    if imagem is None:
+        raise ValueError("Imagem inválida")
+    return imagem
+
+
+def regiao_rosto(frame, face, margem=0.5):
+    """Recorte do frame em volta do rosto e a caixa do rosto nas coordenadas do recorte.
+
+    A margem cobre a margem/rotação que o pipeline aplica do lado do servidor.
+    """
+    x, y, w, h = (int(v) for v in face)
+    altura, largura = frame.shape[:2]
+    m = int(margem * max(w, h))
+    x0, y0 = max(0, x - m), max(0, y - m)
+    x1, y1 = min(largura, x + w + m), min(altura, y + h + m)
+    return frame[y0:y1, x0:x1], (x - x0, y - y0, w, h)
+
+
+class ClienteReconhecimento:
+    def __init__(self, url, chave=None, timeout=10.0):
+        self.url = url.rstrip("/")
+        self.chave = chave
+        self.timeout = timeout
+
+    def _chamar(self, rota, dados=None):
+        corpo = None if dados is None else json.dumps(dados).encode("utf-8")
+        pedido = urllib.request.Request(self.url + rota, data=corpo, method="GET" if corpo is None else "POST")
+        pedido.add_header("Content-Type", "application/json")
+        if self.chave:
+            pedido.add_header("X-Chave", self.chave)
+        try:
+            with urllib.request.urlopen(pedido, timeout=self.timeout) as resposta:
+                return json.loads(resposta.read())
+        except urllib.error.HTTPError as e:
+            try:
+                erro = json.loads(e.read()).get("erro", str(e))
+            except ValueError:
+                erro = str(e)
+            raise ValueError(erro) if e.code < 500 else RuntimeError(erro)
+
+    # ---- estado do modelo ----
+
+    def carregar(self, ao_progresso=None, espera_max=120.0):
+        """Espera o servidor ficar pronto; levanta RuntimeError se não ficar em ``espera_max`` s."""
+        if ao_progresso:
+            ao_progresso("Aguardando o servidor de reconhecimento...")
+        limite = time.monotonic() + espera_max
+        erro = "Servidor não ficou pronto a tempo"
+        while time.monotonic() < limite:
+            try:
+                if self.pronto():
+                    return
+            except (ValueError, RuntimeError) as e:
+                erro = str(e)
+            time.sleep(0.5)
+        raise RuntimeError(erro)
+
+    def carregar_em_segundo_plano(self, ao_terminar=None, ao_progresso=None, espera_max=120.0):
+        """Espera o servidor ficar pronto numa thread; ``ao_terminar(ok, erro)`` no fim."""
+        def aguardar():
+            erro = None
+            try:
+                self.carregar(ao_progresso, espera_max)
+            except RuntimeError as e:
+                erro = str(e)
+            if ao_terminar:
+                ao_terminar(erro is None, erro or "")
+        threading.Thread(target=aguardar, name="espera-servidor", daemon=True).start()
+
+    def pronto(self):
+        try:
+            return self._chamar("/saude")["pronto"]
+        except OSError:
+            # Servidor fora do ar (ainda)
+            return False
+
+    # ---- consultas ----
+
+    def identificar_lote(self, imagens, faces=None):
+        faces = faces or [None] * len(imagens)
+        itens = []
+        for imagem, face in zip(imagens, faces):
+            if face is not None:
+                imagem, face = regiao_rosto(imagem, face)
+            itens.append({"imagem": codificar_imagem(imagem), "face": face})
+        return self._chamar("/identificar", {"itens": itens})["resultados"]
+
+    def identificar(self, imagem, face=None):
+        return self.identificar_lote([imagem], [face])[0]
+
+    def _consultar_usuarios(self, nivel=None, limite=None, deslocamento=0):
+        parametros = {"nivel": nivel, "limite": limite, "deslocamento": deslocamento or None}
+        consulta = urllib.parse.urlencode({k: v for k, v in parametros.items() if v is not None})
+        return self._chamar("/usuarios" + ("?" + consulta if consulta else ""))
+
+    def usuarios(self, nivel=None, limite=None, deslocamento=0):
+        usuarios = self._consultar_usuarios(nivel, limite, deslocamento)["usuarios"]
+        return usuarios if nivel is not None else [tuple(u) for u in usuarios]
+
+    def contar_usuarios(self, nivel=None):
+        return self._consultar_usuarios(nivel, limite=0)["total"]
+
+    def total_usuarios(self):
+        return self._chamar("/saude")["usuarios"]
+
+    # ---- alterações ----
+
+    def cadastrar(self, nome, nivel, amostras, faces=None):
+        # O frame vai inteiro (é a foto gravada no cadastro), com a caixa já detectada
+        if faces:
+            faces = [None if face is None else [int(v) for v in face] for face in faces]
+        dados = {"nome": nome, "nivel": nivel, "amostras": [codificar_imagem(a) for a in amostras], "faces": faces}
+        return self._chamar("/cadastrar", dados)["caminhos"]
+
+    def remover(self, nome, nivel):
+        return self._chamar("/remover", {"nome": nome, "nivel": nivel})["apagados"]
@@ -0,0 +1,194 @@
+import numpy as np
+
+from indice import IndiceFlat, normalizar_linhas
+from quantizacao import MatrizQuantizada
+
+# ============================
+# Comparação 1:N vetorizada
+# ============================
+#
+# Os embeddings da galeria ficam num índice (exato ou aproximado, ver
+# indice.py) com vetores float32 já normalizados, de modo que a distância de
+# cosseno contra todos os usuários sai de um único produto matriz-vetor (ou
+# matriz-matriz para um lote de rostos).
+#
+# Um usuário (nome + Nível) pode ter várias fotos (templates). A pontuação do
+# usuário depende da agregação:
+#   "max"       -> distância do template mais próximo
+#   "media"     -> média das distâncias para todos os templates do usuário; como
+#                  1 - q·t é linear em t, é 1 - q·(média dos templates), então a
+#                  busca é um produto só contra uma matriz com a média de cada
+#                  usuário (montada na primeira busca, na precisão do índice)
+#   "centroide" -> distância para a média normalizada dos templates; o índice
+#                  guarda um único vetor por usuário
+#
+# Cada registro é achado pelo seu "id" (atribuído pela Galeria) ou, na falta
+# dele, pela posição na lista.
+#
+# Fora do modo "centroide" os templates ficam só no índice (que pode guardá-los
+# quantizados): depois de indexados, os registros perdem o "embedding" para
+# não manter uma segunda cópia float32 da galeria na memória.
+
+AGREGACOES = ("max", "media", "centroide")
+
+
+def chave_usuario(registro):
+    return registro["nome"], registro["Nível"]
+
+
+class Comparador:
+    def __init__(self, registros, indice=None, criar_indice=IndiceFlat, agregacao="max"):
+        if agregacao not in AGREGACOES:
+            raise ValueError(f"Agregação desconhecida: {agregacao}")
+        self.registros = tuple(registros)
+        self.criar_indice = criar_indice
+        self.agregacao = agregacao
+        self._por_id = {r.get("id", i): r for i, r in enumerate(self.registros)}
+        self._ids_por_usuario = {}
+        for id_registro, registro in self._por_id.items():
+            self._ids_por_usuario.setdefault(chave_usuario(registro), []).append(id_registro)
+        self._max_templates = max((len(ids) for ids in self._ids_por_usuario.values()), default=1)
+        self._cache_templates = {}
+        self._medias = None
+        if indice is None:
+            indice = criar_indice()
+            vetores, ids = self._vetores_indexados(self._ids_por_usuario)
+            if ids:
+                indice.construir(np.vstack(vetores), ids)
+        self.indice = indice
+        if agregacao != "centroide":
+            self._descartar_embeddings()
+
+    def _descartar_embeddings(self):
+        # O modo centroide precisa dos templates originais para recalcular a média
+        # quando um usuário muda; os outros leem os templates do índice
+        self.registros = tuple(
+            {c: v for c, v in r.items() if c != "embedding"} if "embedding" in r else r
+            for r in self.registros
+        )
+        self._por_id = {r.get("id", i): r for i, r in enumerate(self.registros)}
+
+    def __len__(self):
+        return len(self.registros)
+
+    def usuarios(self):
+        return len(self._ids_por_usuario)
+
+    def _templates(self, chave):
+        if chave not in self._cache_templates:
+            ids = self._ids_por_usuario[chave]
+            if self.agregacao == "centroide":
+                vetores = np.vstack([self._por_id[i]["embedding"] for i in ids])
+            else:
+                vetores = self.indice.vetores(ids)
+            self._cache_templates[chave] = normalizar_linhas(vetores)
+        return self._cache_templates[chave]
+
+    def _vetores_indexados(self, usuarios):
+        """Vetores/ids que vão para o índice: os templates ou um centróide por usuário
+        (identificado pelo id do primeiro template)."""
+        vetores, ids = [], []
+        for chave in usuarios:
+            ids_usuario = self._ids_por_usuario.get(chave)
+            if not ids_usuario:
+                continue
+            if self.agregacao == "centroide":
+                vetores.append(normalizar_linhas(self._templates(chave).mean(axis=0)))
+                ids.append(ids_usuario[0])
+            else:
+                vetores.extend(self._por_id[i]["embedding"] for i in ids_usuario)
+                ids.extend(ids_usuario)
+        return vetores, ids
+
+    def alterado(self, novos=(), ids_removidos=()):
+        """Comparador novo com os registros incluídos/removidos, sem reconstruir o índice."""
+        ids_removidos = set(ids_removidos)
+        registros = [r for r in self.registros if r.get("id") not in ids_removidos] + list(novos)
+        afetados = {chave_usuario(self._por_id[i]) for i in ids_removidos if i in self._por_id}
+        afetados |= {chave_usuario(r) for r in novos}
+
+        indice = self.indice
+        if self.agregacao == "centroide":
+            saem = [self._ids_por_usuario[c][0] for c in afetados if c in self._ids_por_usuario]
+        else:
+            saem = list(ids_removidos)
+        if saem:
+            indice = indice.remover(np.asarray(saem, dtype=np.int64))
+
+        novo = Comparador(registros, indice, self.criar_indice, self.agregacao)
+        if self.agregacao == "centroide":
+            vetores, ids = novo._vetores_indexados(afetados)
+        else:
+            vetores, ids = [r["embedding"] for r in novos], [r["id"] for r in novos]
+        if ids:
+            novo.indice = indice.adicionar(np.vstack(vetores), ids)
+        return novo
+
+    def _matriz_medias(self):
+        """(chaves dos usuários, MatrizQuantizada com a média dos templates de cada um)."""
+        if self._medias is None:
+            vetores, ids = self.indice.todos()
+            chaves = list(self._ids_por_usuario)
+            posicao = {c: p for p, c in enumerate(chaves)}
+            usuario = np.fromiter((posicao[chave_usuario(self._por_id[int(i)])] for i in ids),
+                                  dtype=np.int64, count=len(ids))
+            somas = np.zeros((len(chaves), vetores.shape[1] if len(ids) else 0), dtype=np.float32)
+            np.add.at(somas, usuario, vetores)
+            somas /= np.maximum(np.bincount(usuario, minlength=len(chaves)), 1)[:, np.newaxis]
+            precisao = getattr(self.indice, "precisao", "float32")
+            self._medias = (chaves, MatrizQuantizada.de(somas, precisao))
+        return self._medias
+
+    def _buscar_media(self, consultas, k):
+        chaves, medias = self._matriz_medias()
+        if not chaves:
+            return [[] for _ in consultas]
+        dist = 1.0 - medias.similaridades(consultas)
+        k_real = min(k, len(chaves))
+        resultados = []
+        for consulta, linha in zip(consultas, dist):
+            melhores = np.argpartition(linha, k_real - 1)[:k_real]
+            melhores = melhores[np.argsort(linha[melhores], kind="stable")]
+            encontrados = []
+            for u in melhores:
+                ids = self._ids_por_usuario[chaves[u]]
+                # Devolve o template mais próximo do usuário, como nas outras agregações
+                mais_proximo = ids[int(np.argmax(self._templates(chaves[u]) @ consulta))]
+                encontrados.append((self._por_id[mais_proximo], float(linha[u])))
+            resultados.append(encontrados)
+        return resultados
+
+    def buscar_lote(self, embeddings, k=1):
+        """Top-k usuários de cada rosto do lote: lista de [(registro, distância), ...].
+
+        O registro devolvido é o template mais próximo do usuário.
+        """
+        consultas = normalizar_linhas(np.atleast_2d(embeddings))
+        if self.agregacao == "media":
+            return self._buscar_media(consultas, k)
+        k_busca = k if self.agregacao == "centroide" else k * self._max_templates
+        distancias, ids = self.indice.buscar(consultas, k_busca)
+        resultados = []
+        for consulta, linha_d, linha_ids in zip(consultas, distancias, ids):
+            melhores = {}
+            for d, i in zip(linha_d, linha_ids):
+                if i < 0:
+                    continue
+                registro = self._por_id[i]
+                melhores.setdefault(chave_usuario(registro), (float(d), registro))
+            ordenados = sorted(melhores.values(), key=lambda item: item[0])[:k]
+            resultados.append([(registro, d) for d, registro in ordenados])
+        return resultados
+
+    def buscar(self, embedding, k=1):
+        return self.buscar_lote(embedding, k)[0]
+
+    def identificar(self, embedding, limiar):
+        """Usuário mais próximo se estiver abaixo do limiar, senão (None, distância)."""
+        melhores = self.buscar(embedding, 1)
+        if not melhores:
+            return None, None
+        registro, dist = melhores[0]
+        if dist < limiar:
+            return registro, dist
+        return None, dist
@@ -0,0 +1,28 @@
+# ============================
+# Configurações do sistema
+# ============================
+
+DB_PATH = "usuarios"
+CACHE_PATH = "cache_embeddings"
+MODELO = "VGG-Face"
+TIPO_INDICE = "flat"  # "ivf" para galerias grandes (ver: python indice.py --help)
+THRESHOLD = 0.40
+SECURITY_KEY = "123456"
+FONTE_VIDEO = 0  # câmera, arquivo de vídeo, pasta de imagens, rtsp://... ou "simulado:<vídeo>" (ver captura.py)
+CAMERA_OCIOSA = 60  # segundos que a câmera fica aberta sem ninguém usando (None = sempre aberta)
+WORKERS_RECONHECIMENTO = 1
+NIVEIS = ["nivel_1", "nivel_2", "nivel_3"]
+AGREGACAO = "max"  # como combinar as várias fotos de um usuário: "max", "media" ou "centroide"
+AMOSTRAS_CADASTRO = 5
+DETECCAO_ESCALA = 0.5  # redução do frame na detecção do preview
+DETECCAO_PASSO = 10  # a cada quantos frames roda a detecção completa (0 = nunca)
+JANELA_QUALIDADE = 0.5  # segundos juntando rostos bons antes de mandar o melhor para o modelo
+SERVIDOR_RECONHECIMENTO = None  # ex.: "http://127.0.0.1:8765" para usar o servidor.py; None = tudo neste processo
+METRICAS_INTERVALO_LOG = 60  # segundos entre linhas JSON de métricas no stderr (0 = desligado)
+METRICAS_PORTA = None  # ex.: 8766 para ver as métricas em http://127.0.0.1:8766/metricas
+PRECISAO_GALERIA = "float32"  # "float16" ou "int8" guardam a galeria em 1/2 ou ~1/4 da memória (ver python quantizacao.py)
+PORTAS = {"entrada": FONTE_VIDEO}  # modo várias portas (python portas.py): nome -> fonte de vídeo
+LOTE_PORTAS = 8  # máximo de rostos (de todas as portas) numa inferência só
+PAUSA_PORTA = 3.0  # segundos que uma porta ignora rostos depois de liberar/negar alguém
+CORPO_MAXIMO_SERVIDOR = 32 * 1024 * 1024  # bytes aceitos num POST do servidor.py (acima disso, 413)
+PROCESSOS_MODELO = 0  # >0 roda o modelo em N processos separados (ver modelo_processos.py); 0 = thread neste processo
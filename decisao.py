@@ -0,0 +1,59 @@
+from collections import deque
+
+# ============================
+# Decisão de login com vários frames
+# ============================
+#
+# Cada rosto processado vira uma evidência: margem = limiar - distância do
+# usuário mais próximo (positiva a favor dele, negativa a favor de
+# "desconhecido"). As evidências dos últimos ``janela`` rostos são somadas e a
+# decisão sai assim que uma delas passa do limite:
+#   - aceito: margem do melhor usuário menos a dos outros >= evidencia_aceite
+#     (um único rosto bem parecido já basta; casos no limite juntam mais frames)
+#   - negado: margem acumulada contra >= evidencia_negacao, ou max_rostos sem decisão
+#     (rostos que falharam, com distância None, também contam para max_rostos)
+
+
+class DecisorTemporal:
+    def __init__(self, limiar, janela=6, evidencia_aceite=0.15, evidencia_negacao=0.5, max_rostos=10):
+        self.limiar = limiar
+        self.janela = janela
+        self.evidencia_aceite = evidencia_aceite
+        self.evidencia_negacao = evidencia_negacao
+        self.max_rostos = max_rostos
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._margens = deque(maxlen=self.janela)
+        self.rostos = 0
+        self.usuario = None
+
+    def adicionar(self, usuario, distancia):
+        """Registra um rosto: ``usuario`` é o mais próximo na galeria (ou None).
+
+        Devolve "aceito" (ver self.usuario), "negado" ou None se ainda faltar evidência.
+        """
+        self.rostos += 1
+        if distancia is None:
+            # Rosto que não chegou a ser comparado (erro no embedding, servidor fora,
+            # galeria vazia) não é evidência, mas conta para max_rostos
+            return "negado" if self.rostos >= self.max_rostos else None
+        self._margens.append((usuario, self.limiar - distancia))
+
+        a_favor = {}
+        contra = 0.0
+        for u, margem in self._margens:
+            if margem > 0 and u is not None:
+                a_favor[u] = a_favor.get(u, 0.0) + margem
+            else:
+                contra -= margem
+        if a_favor:
+            melhor = max(a_favor, key=a_favor.get)
+            # Votos em outros usuários contam contra o melhor
+            saldo = 2 * a_favor[melhor] - sum(a_favor.values())
+            if saldo >= self.evidencia_aceite:
+                self.usuario = melhor
+                return "aceito"
+        if contra >= self.evidencia_negacao or self.rostos >= self.max_rostos:
+            return "negado"
+        return None
@@ -0,0 +1,79 @@
+import time
+import cv2
+
+from metricas import METRICAS
+
+# ============================
+# Detecção de rosto no preview (reduzida + rastreada)
+# ============================
+#
+# Rodar a Haar no frame inteiro a cada frame é o que mais pesa no preview.
+# Aqui cada frame usa o modo mais barato possível:
+#   "janela"  -> procura só numa janela em volta da última caixa (resolução original)
+#   "reduzida"-> frame inteiro reduzido por ``escala`` (sem rosto conhecido ou rosto perdido)
+#   "completa"-> frame inteiro em resolução original, a cada ``passo`` frames,
+#                para corrigir o rastreamento e achar rostos novos
+# O tempo de cada detecção fica em ultimo_tempo_ms e estatisticas(), e vai para
+# METRICAS como "deteccao" e "deteccao_<modo>".
+
+
+class DetectorRastreado:
+    def __init__(self, pipeline, escala=0.5, passo=10, margem_busca=0.5):
+        self.pipeline = pipeline
+        self.escala = escala
+        self.passo = passo
+        self.margem_busca = margem_busca
+        self.ultima_caixa = None
+        self.frames = 0
+        self.ultimo_tempo_ms = 0.0
+        self.ultimo_modo = None
+        self._tempos = {}
+
+    def _janela(self, cinza):
+        x, y, w, h = self.ultima_caixa
+        altura, largura = cinza.shape[:2]
+        m = int(self.margem_busca * max(w, h))
+        x0, y0 = max(0, x - m), max(0, y - m)
+        x1, y1 = min(largura, x + w + m), min(altura, y + h + m)
+        # O rosto não muda muito de tamanho de um frame para o outro
+        faces = self.pipeline.detectar_cinza(cinza[y0:y1, x0:x1], int(min(w, h) * 0.6), int(max(w, h) * 1.5))
+        return [(fx + x0, fy + y0, fw, fh) for fx, fy, fw, fh in faces]
+
+    def _reduzida(self, cinza):
+        pequena = cv2.resize(cinza, None, fx=self.escala, fy=self.escala, interpolation=cv2.INTER_AREA)
+        faces = self.pipeline.detectar_cinza(pequena)
+        return [tuple(int(v / self.escala) for v in face) for face in faces]
+
+    def detectar(self, frame):
+        """Rostos (x, y, w, h) do frame, do maior para o menor."""
+        inicio = time.perf_counter()
+        cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.frames += 1
+        faces = []
+        if self.passo and self.frames % self.passo == 0:
+            modo = "completa"
+            faces = self.pipeline.detectar_cinza(cinza)
+        else:
+            if self.ultima_caixa is not None:
+                modo = "janela"
+                faces = self._janela(cinza)
+            if not faces:
+                modo = "reduzida"
+                faces = self._reduzida(cinza)
+        self.ultima_caixa = faces[0] if faces else None
+
+        duracao = time.perf_counter() - inicio
+        METRICAS.registrar("deteccao", duracao)
+        METRICAS.registrar(f"deteccao_{modo}", duracao)
+        self.ultimo_tempo_ms = duracao * 1000
+        self.ultimo_modo = modo
+        n, total = self._tempos.get(modo, (0, 0.0))
+        self._tempos[modo] = (n + 1, total + self.ultimo_tempo_ms)
+        return faces
+
+    def estatisticas(self):
+        """Quantidade de frames e tempo médio (ms) de detecção por modo."""
+        return {
+            modo: {"frames": n, "media_ms": round(total / n, 3)}
+            for modo, (n, total) in self._tempos.items()
+        }
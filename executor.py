@@ -0,0 +1,197 @@
+import itertools
+import threading
+from collections import deque, OrderedDict
+
+from metricas import METRICAS
+
+# ============================
+# Executor de reconhecimento
+# ============================
+#
+# Número fixo de workers consumindo uma fila limitada: se a fila estiver cheia,
+# o pedido mais antigo é descartado (o rosto mais novo é o que interessa).
+# Cada pedido pertence a uma sessão; ao trocar/cancelar a sessão os pedidos
+# pendentes são jogados fora e resultados que ainda estavam em processamento
+# não são entregues.
+
+
+class ExecutorReconhecimento:
+    def __init__(self, funcao, ao_concluir, n_workers=1, tamanho_fila=2):
+        self.funcao = funcao
+        self.ao_concluir = ao_concluir
+        self._fila = deque()
+        self._tamanho_fila = tamanho_fila
+        self._cond = threading.Condition()
+        self._sessoes = itertools.count(1)
+        self._pedidos = itertools.count(1)
+        self.sessao = None
+        self.em_andamento = 0
+        self.descartados = 0
+        self.encerrado = False
+        self._workers = [
+            threading.Thread(target=self._trabalhar, name=f"reconhecimento-{i}", daemon=True)
+            for i in range(n_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def nova_sessao(self):
+        """Começa uma sessão nova, descartando tudo o que era da anterior."""
+        with self._cond:
+            self._fila.clear()
+            self.sessao = next(self._sessoes)
+            return self.sessao
+
+    def cancelar(self):
+        with self._cond:
+            self._fila.clear()
+            self.sessao = None
+
+    def submeter(self, sessao, *args):
+        """Enfileira um pedido; devolve o id do pedido ou None se a sessão não é a atual."""
+        with self._cond:
+            if self.encerrado or sessao != self.sessao:
+                return None
+            if len(self._fila) >= self._tamanho_fila:
+                self._fila.popleft()
+                self.descartados += 1
+                METRICAS.contar("pedidos_descartados")
+            pedido = next(self._pedidos)
+            self._fila.append((sessao, pedido, args))
+            self._cond.notify()
+            return pedido
+
+    def pendentes(self):
+        with self._cond:
+            return len(self._fila) + self.em_andamento
+
+    def _trabalhar(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._fila or self.encerrado)
+                if self.encerrado:
+                    return
+                sessao, pedido, args = self._fila.popleft()
+                self.em_andamento += 1
+            try:
+                resultado = self.funcao(*args)
+            except Exception as e:
+                print(f"Erro no reconhecimento (pedido {pedido}): {e}")
+                resultado = None
+            with self._cond:
+                self.em_andamento -= 1
+                atual = sessao == self.sessao and not self.encerrado
+            if atual and resultado is not None:
+                self.ao_concluir(dict(resultado, sessao=sessao, pedido=pedido))
+
+    def encerrar(self, timeout=1.0):
+        with self._cond:
+            self.encerrado = True
+            self._fila.clear()
+            self.sessao = None
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+
+
+# ============================
+# Executor em lotes para várias origens
+# ============================
+#
+# Várias portas/câmeras mandando rostos para um modelo só: cada origem (chave)
+# tem a própria fila curta (o mais antigo sai quando enche) e o worker monta
+# cada lote revezando entre as origens, um pedido de cada por vez. Quem ficou
+# de fora de um lote cheio entra primeiro no próximo, então uma porta com
+# movimento não deixa as outras esperando.
+#
+# ``funcao_lote(itens)`` recebe a lista de itens e devolve um resultado por
+# item, na mesma ordem; cada resultado vai para o ``ao_concluir`` do pedido.
+
+
+class ExecutorLotes:
+    def __init__(self, funcao_lote, lote_max=8, por_chave=2, espera=0.005):
+        self.funcao_lote = funcao_lote
+        self.lote_max = lote_max
+        self.por_chave = por_chave
+        # Quanto esperar por pedidos de outras origens antes de rodar um lote incompleto
+        self.espera = espera
+        self._filas = OrderedDict()
+        self._cond = threading.Condition()
+        self.em_andamento = {}
+        self.descartados = 0
+        self.lotes = 0
+        self.itens = 0
+        self.encerrado = False
+        self._worker = threading.Thread(target=self._trabalhar, name="reconhecimento-lotes", daemon=True)
+        self._worker.start()
+
+    def submeter(self, chave, item, ao_concluir):
+        """Enfileira ``item`` na fila da origem ``chave``; devolve False se já encerrou."""
+        with self._cond:
+            if self.encerrado:
+                return False
+            fila = self._filas.setdefault(chave, deque())
+            if len(fila) >= self.por_chave:
+                fila.popleft()
+                self.descartados += 1
+                METRICAS.contar("pedidos_descartados")
+            fila.append((item, ao_concluir))
+            self._cond.notify()
+            return True
+
+    def _total(self):
+        return sum(len(fila) for fila in self._filas.values())
+
+    def pendentes(self, chave=None):
+        with self._cond:
+            if chave is None:
+                return self._total() + sum(self.em_andamento.values())
+            return len(self._filas.get(chave, ())) + self.em_andamento.get(chave, 0)
+
+    def _montar_lote(self):
+        lote = []
+        atendidas = []
+        while len(lote) < self.lote_max:
+            rodada = [chave for chave, fila in self._filas.items() if fila]
+            if not rodada:
+                break
+            for chave in rodada[:self.lote_max - len(lote)]:
+                lote.append((chave,) + self._filas[chave].popleft())
+                if chave not in atendidas:
+                    atendidas.append(chave)
+        # Quem foi atendido vai para o fim da vez
+        for chave in atendidas:
+            self._filas.move_to_end(chave)
+            self.em_andamento[chave] = sum(1 for c, _, _ in lote if c == chave)
+        return lote
+
+    def _trabalhar(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._total() or self.encerrado)
+                if self.encerrado:
+                    return
+                if self.espera:
+                    self._cond.wait_for(lambda: self._total() >= self.lote_max or self.encerrado, self.espera)
+                lote = self._montar_lote()
+            try:
+                resultados = self.funcao_lote([item for _, item, _ in lote])
+            except Exception as e:
+                print(f"Erro no reconhecimento (lote de {len(lote)}): {e}")
+                resultados = [None] * len(lote)
+            with self._cond:
+                self.em_andamento.clear()
+                self.lotes += 1
+                self.itens += len(lote)
+            METRICAS.contar("lotes")
+            METRICAS.contar("rostos_em_lotes", len(lote))
+            for (_, _, ao_concluir), resultado in zip(lote, resultados):
+                if resultado is not None:
+                    ao_concluir(resultado)
+
+    def encerrar(self, timeout=1.0):
+        with self._cond:
+            self.encerrado = True
+            self._filas.clear()
+            self._cond.notify_all()
+        self._worker.join(timeout)
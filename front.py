@@ -1,94 +1,118 @@
+# Primeiro de tudo: os tempos de partida contam a partir daqui (ver partida.py)
+from partida import PARTIDA
 import sys
 import os
-import unicodedata
-import cv2
-import threading
+import json
 import time
+import functools
+import threading
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QLineEdit,
-    QMessageBox, QComboBox, QInputDialog, QHBoxLayout
+    QMessageBox, QComboBox, QInputDialog, QHBoxLayout, QSizePolicy
 )
 from PyQt6.QtCore import QTimer, pyqtSignal, Qt
-from PyQt6.QtGui import QImage, QPixmap, QFont, QBrush, QPalette
-from deepface import DeepFace
-from scipy.spatial.distance import cosine
+from PyQt6.QtGui import QFont, QBrush, QPalette
+from executor import ExecutorReconhecimento
+from config import (
+    THRESHOLD, SECURITY_KEY, FONTE_VIDEO, CAMERA_OCIOSA, WORKERS_RECONHECIMENTO, AMOSTRAS_CADASTRO,
+    NIVEIS, DETECCAO_ESCALA, DETECCAO_PASSO, JANELA_QUALIDADE, SERVIDOR_RECONHECIMENTO,
+    METRICAS_INTERVALO_LOG, METRICAS_PORTA
+)
+from util import normalizar_nome, validar_usuario
+from decisao import DecisorTemporal
+from imagens import CacheImagens
+from metricas import METRICAS, LogMetricas, servir_metricas
 
-DB_PATH = "usuarios"
-THRESHOLD = 0.40
-SECURITY_KEY = "123456"
+# OpenCV, modelo e galeria só são importados/carregados com a janela já aberta
+# (FaceApp.carregar_servico); os imports locais abaixo pegam os módulos já prontos.
+PARTIDA.marcar("imports")
+
+PASTA_IMAGENS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "imagens")
+
+MENSAGENS_QUALIDADE = {
+    "pequeno": "Aproxime-se da câmera",
+    "iluminacao": "Melhore a iluminação do rosto",
+    "borrado": "Fique parado um instante",
+    "perfil": "Olhe para a câmera",
+}
 
 # ============================
 # Funções auxiliares
 # ============================
 
-def normalizar_nome(texto):
-    texto = ''.join(
-        c for c in unicodedata.normalize('NFKD', texto)
-        if not unicodedata.combining(c)
-    )
-    texto = texto.replace(" ", "_").lower()
-    return texto
-
-
-def cadastrar_usuario(nome, cargo):
-    cargo_norm = normalizar_nome(cargo)
-    pasta_cargo = os.path.join(DB_PATH, cargo_norm)
-    os.makedirs(pasta_cargo, exist_ok=True)
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
+def capturar_amostras(pipeline, n_amostras=AMOSTRAS_CADASTRO):
+    """Usa a câmera compartilhada e devolve (frames, caixas dos rostos) escolhidos para o cadastro (ou None)."""
+    import cv2
+    from captura import FonteVideo
+    from qualidade import SeletorAmostras
+    assinatura = FonteVideo.assinar_origem(FONTE_VIDEO, ociosa=CAMERA_OCIOSA)
+    if assinatura is None:
         QMessageBox.warning(None, "Erro", "Não foi possível abrir a câmera.")
-        return False
+        return None
 
-    QMessageBox.information(None, "Instrução", "Posicione seu rosto e pressione 's' para salvar.")
+    QMessageBox.information(None, "Instrução", "Posicione seu rosto e pressione 's' para começar.\n"
+                            "Durante a captura, mova levemente a cabeça para os lados.")
 
+    seletor = SeletorAmostras(n_amostras)
+    capturando = False
     while True:
-        ret, frame = cap.read()
-        if not ret:
+        item = assinatura.proximo(timeout=2.0)
+        if item is None:
             break
-        cv2.imshow("Cadastro de Usuário", frame)
+        _, _, frame = item
+        if capturando:
+            # Só guarda frames nítidos e diferentes dos que já foram aceitos
+            faces = pipeline.detectar(frame)
+            if faces:
+                seletor.oferecer(frame, faces[0])
+            if seletor.completo():
+                break
+        exibicao = frame.copy()
+        if capturando:
+            cv2.putText(exibicao, f"Amostras: {len(seletor.amostras)}/{n_amostras}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (136, 255, 0), 2)
+        cv2.imshow("Cadastro de Usuário", exibicao)
         key = cv2.waitKey(1) & 0xFF
         if key == ord('s'):
-            caminho_foto = os.path.join(pasta_cargo, f"{nome}.jpg")
-            cv2.imwrite(caminho_foto, frame)
-            QMessageBox.information(None, "Sucesso", f"Foto salva em: {caminho_foto}")
-            break
+            capturando = True
         elif key == ord('q'):
             QMessageBox.information(None, "Cancelado", "Cadastro cancelado.")
-            cap.release()
+            assinatura.fechar()
             cv2.destroyAllWindows()
-            return False
+            return None
 
-    cap.release()
+    # A câmera continua aberta (por CAMERA_OCIOSA segundos) para o próximo uso
+    assinatura.fechar()
     cv2.destroyAllWindows()
-    return True
+    if not seletor.amostras:
+        return None
+    return seletor.amostras, seletor.faces
 
 
-def carregar_base_embeddings():
-    embeddings = []
-    if not os.path.exists(DB_PATH):
-        return embeddings
-
-    for root, dirs, files in os.walk(DB_PATH):
-        for file in files:
-            caminho = os.path.join(root, file)
-            nome = os.path.splitext(os.path.basename(caminho))[0]
-            nivel = os.path.basename(root)
-            try:
-                emb = DeepFace.represent(caminho, model_name="VGG-Face", enforce_detection=False)[0]["embedding"]
-                embeddings.append({"embedding": emb, "nome": nome, "Nível": nivel})
-            except Exception as e:
-                print(f"Erro ao processar {caminho}: {e}")
-    return embeddings
+def analisar_frame(detector, avaliador, frame):
+    # Roda na thread de captura: detecção + filtro de qualidade do maior rosto
+    faces = detector.detectar(frame)
+    if not faces:
+        return faces, 0.0, None
+    pontuacao, motivo = avaliador.avaliar(frame, faces[0])
+    return faces, pontuacao, motivo
 
 
 # ============================
 # DASHBOARD (Imagem conforme nível)
 # ============================
 
+def tamanho_imagem_nivel():
+    # Reduz o tamanho da imagem (ex: 70% da tela)
+    screen_rect = QApplication.primaryScreen().availableGeometry()
+    return int(screen_rect.width() * 0.7), int(screen_rect.height() * 0.7)
+
+
 class Dashboard(QWidget):
-    def __init__(self, nivel="nivel_1", nome=""):
+    def __init__(self, nivel="nivel_1", nome="", imagens=None):
         super().__init__()
         self.nivel = nivel
+        self.imagens = imagens or CacheImagens()
         self.nome = nome.capitalize()
 
         layout = QVBoxLayout()
@@ -134,29 +158,16 @@ class Dashboard(QWidget):
 
     def carregar_imagem_enquadrada(self):
         """Carrega a imagem do nível centralizada e em tamanho reduzido."""
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        caminho = os.path.join(base_dir, "imagens", f"{self.nivel}.png")
+        caminho = os.path.join(PASTA_IMAGENS, f"{self.nivel}.png")
+        largura, altura = tamanho_imagem_nivel()
+        pixmap = self.imagens.escalada(caminho, largura, altura)
 
-        if not os.path.exists(caminho):
+        if pixmap is None:
             self.lbl_imagem.setText(f"Imagem não encontrada:\n{caminho}")
             self.lbl_imagem.setStyleSheet("color: white; font-size: 16px;")
             return
 
-        pixmap = QPixmap(caminho)
-        screen_rect = QApplication.primaryScreen().availableGeometry()
-
-        # Reduz o tamanho da imagem (ex: 70% da tela)
-        largura = int(screen_rect.width() * 0.7)
-        altura = int(screen_rect.height() * 0.7)
-
-        self.lbl_imagem.setPixmap(
-            pixmap.scaled(
-                largura,
-                altura,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-        )
+        self.lbl_imagem.setPixmap(pixmap)
 
     def voltar_login(self):
         self.setVisible(False)
@@ -169,41 +180,108 @@ class Dashboard(QWidget):
 
 class FaceApp(QWidget):
     atualizar_frame_signal = pyqtSignal(object)
+    servico_pronto_signal = pyqtSignal(bool, str)
+    progresso_signal = pyqtSignal(str)
+    imagens_prontas_signal = pyqtSignal(object)
 
-    def __init__(self):
+    def __init__(self, sair_quando_pronto=False):
         super().__init__()
         self.setWindowTitle("Sistema de Reconhecimento Facial")
         self.setGeometry(100, 100, 900, 600)
 
-        self.base_embeddings = carregar_base_embeddings()
+        # Modelo e galeria ficam no serviço de reconhecimento: neste processo ou
+        # num servidor.py compartilhado entre terminais. Tudo isso é carregado em
+        # segundo plano depois que a janela aparece (iniciar_servico)
+        self.servico = None
+        self.pipeline = None
+        self.preview = None
+        self.sair_quando_pronto = sair_quando_pronto
+        self.servico_pronto_signal.connect(self.atualizar_status_servico)
         self.reconhecendo = False
-        self.cap = None
+        self.captura = None
+        self.ultimo_seq = 0
         self.timer = QTimer()
         self.timer.timeout.connect(self.atualizar_frame)
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
         self.atualizar_frame_signal.connect(self.atualizar_frame_reconhecido)
-        self.last_process_time = 0
+        # Resultados chegam pelo sinal, já marcados com a sessão que os pediu
+        self.executor = ExecutorReconhecimento(self.processar_face, self.atualizar_frame_signal.emit,
+                                               n_workers=WORKERS_RECONHECIMENTO)
+        self.sessao = None
+        self.janela_qualidade = None
+        self.decisor = DecisorTemporal(THRESHOLD)
+        self.imagens = CacheImagens()
+        self.imagens_prontas_signal.connect(self.imagens.guardar_imagens)
+        # Métricas do reconhecimento: linha JSON periódica e/ou rota HTTP /metricas
+        self.log_metricas = None
+        if METRICAS_INTERVALO_LOG:
+            self.log_metricas = LogMetricas(intervalo=METRICAS_INTERVALO_LOG)
+            self.log_metricas.start()
+        self.servidor_metricas = servir_metricas(METRICAS_PORTA) if METRICAS_PORTA else None
+        # Só reescala o fundo quando o redimensionamento para (ex.: entrar em tela cheia)
+        self.timer_fundo = QTimer()
+        self.timer_fundo.setSingleShot(True)
+        self.timer_fundo.setInterval(120)
+        self.timer_fundo.timeout.connect(self.aplicar_fundo)
         self.init_ui()
+        QTimer.singleShot(0, self.iniciar_servico)
+
+    def iniciar_servico(self):
+        # Primeira volta do laço de eventos: a janela já está na tela
+        PARTIDA.marcar("janela")
+        self.progresso_signal.connect(self.lbl_status.setText)
+        threading.Thread(target=self.carregar_servico, name="partida", daemon=True).start()
+        # Imagens dos níveis ficam prontas antes do primeiro login, decodificadas
+        # fora da thread da interface
+        threading.Thread(target=self.precarregar_imagens, args=tamanho_imagem_nivel(),
+                         name="imagens", daemon=True).start()
+
+    def carregar_servico(self):
+        # Roda em segundo plano: módulos pesados, modelo e galeria, avisando a interface a cada etapa
+        try:
+            self.progresso_signal.emit("Carregando bibliotecas...")
+            with PARTIDA.etapa("import reconhecimento"):
+                from pipeline import PipelineRosto
+                # Já deixa importados os módulos do login e do cadastro (OpenCV)
+                import captura, deteccao, qualidade, preview
+                if SERVIDOR_RECONHECIMENTO:
+                    from cliente import ClienteReconhecimento
+                    servico = ClienteReconhecimento(SERVIDOR_RECONHECIMENTO, SECURITY_KEY)
+                else:
+                    from servico import ServicoReconhecimento
+                    servico = ServicoReconhecimento()
+            # Aqui só roda a detecção Haar (preview e cadastro); o embedding é do serviço
+            self.pipeline = PipelineRosto(None)
+            self.servico = servico
+            servico.carregar(self.progresso_signal.emit)
+        except Exception as e:
+            self.servico_pronto_signal.emit(False, str(e))
+            return
+        self.servico_pronto_signal.emit(True, "")
 
-    def resize_background(self, event):
-        # Redimensiona a imagem de fundo quando a janela é redimensionada
-        caminho_imagem = os.path.join(os.path.dirname(os.path.abspath(__file__)), "imagens", "login.png")
-        pixmap = QPixmap(caminho_imagem)
-        if not pixmap.isNull():
-            palette = self.palette()
-            palette.setBrush(self.backgroundRole(), QBrush(pixmap.scaled(event.size(), Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)))
-            self.setPalette(palette)
-        super().resizeEvent(event)
+    def precarregar_imagens(self, largura, altura):
+        # Roda em segundo plano: só QImage aqui; o QPixmap é criado na thread da interface
+        self.imagens_prontas_signal.emit(CacheImagens.decodificar(
+            (os.path.join(PASTA_IMAGENS, f"{nivel}.png"), largura, altura, True) for nivel in NIVEIS
+        ))
 
-    def init_ui(self):
+    def aplicar_fundo(self):
         # Configuração da imagem de fundo via QPalette (abordagem recomendada para PyQt)
-        caminho_imagem = os.path.join(os.path.dirname(os.path.abspath(__file__)), "imagens", "login.png")
-        pixmap = QPixmap(caminho_imagem)
-        if not pixmap.isNull():
+        tamanho = self.size()
+        pixmap = self.imagens.escalada(os.path.join(PASTA_IMAGENS, "login.png"),
+                                       tamanho.width(), tamanho.height(), manter_proporcao=False)
+        if pixmap is not None:
             palette = self.palette()
-            palette.setBrush(self.backgroundRole(), QBrush(pixmap.scaled(self.size(), Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)))
+            palette.setBrush(self.backgroundRole(), QBrush(pixmap))
             self.setPalette(palette)
             self.setAutoFillBackground(True)
+
+    def resize_background(self, event):
+        # Redimensiona a imagem de fundo quando a janela para de ser redimensionada
+        self.timer_fundo.start()
+        super().resizeEvent(event)
+
+    def init_ui(self):
+        self.aplicar_fundo()
         
         self.setStyleSheet("""
             QWidget { background-color: transparent; color: #E0E0E0; font-family: 'Segoe UI'; }
@@ -253,6 +331,11 @@ class FaceApp(QWidget):
         self.lbl_titulo.setAlignment(Qt.AlignmentFlag.AlignCenter)
         login_layout.addWidget(self.lbl_titulo)
 
+        self.lbl_status = QLabel("Iniciando...")
+        self.lbl_status.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.lbl_status.setStyleSheet("color: white; font-size: 14px;")
+        login_layout.addWidget(self.lbl_status)
+
         login_layout.addSpacing(60)
 
         self.btn_login = QPushButton("ENTRAR COM RECONHECIMENTO FACIAL 🔓")
@@ -309,6 +392,9 @@ class FaceApp(QWidget):
         self.btn_login.setCursor(Qt.CursorShape.PointingHandCursor)
         self.btn_cadastrar.setCursor(Qt.CursorShape.PointingHandCursor)
         self.btn_remover.setCursor(Qt.CursorShape.PointingHandCursor)
+        # Liberados quando o serviço de reconhecimento terminar de carregar
+        for botao in (self.btn_login, self.btn_cadastrar, self.btn_remover):
+            botao.setEnabled(False)
 
         self.layout.addWidget(self.login_widget)
 
@@ -380,6 +466,9 @@ class FaceApp(QWidget):
 
         self.label_video = QLabel()
         self.label_video.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        # O tamanho vem do layout, não do pixmap (o frame é escalado para caber no label)
+        self.label_video.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+        self.label_video.setMinimumSize(640, 480)
         recon_layout.addWidget(self.label_video)
 
         btn_parar = QPushButton("Encerrar Sessão")
@@ -424,14 +513,12 @@ class FaceApp(QWidget):
             QMessageBox.warning(self, "Erro", "Chave de segurança inválida!")
             return
 
-        niveis = ["nivel_1", "nivel_2", "nivel_3"]
-        total_usuarios = 0
-        for nivel in niveis:
-            pasta_nivel = os.path.join(DB_PATH, nivel)
-            if os.path.exists(pasta_nivel):
-                total_usuarios += len([f for f in os.listdir(pasta_nivel)
-                                       if f.lower().endswith(('.jpg', '.png', '.jpeg'))])
-        if total_usuarios == 0:
+        try:
+            total = self.servico.contar_usuarios()
+        except Exception as e:
+            QMessageBox.warning(self, "Erro", f"Falha ao listar usuários: {e}")
+            return
+        if not total:
             QMessageBox.information(self, "Nenhum Usuário", "Não há usuários cadastrados.")
             return
 
@@ -478,13 +565,11 @@ class FaceApp(QWidget):
             return
 
         cargo_norm = normalizar_nome(cargo)
-        pasta_cargo = os.path.join(DB_PATH, cargo_norm)
-        if not os.path.exists(pasta_cargo):
-            QMessageBox.information(self, "Sem usuários", f"Não há usuários no {cargo}.")
+        try:
+            usuarios = self.servico.usuarios(cargo_norm)
+        except Exception as e:
+            QMessageBox.warning(self, "Erro", f"Falha ao listar usuários: {e}")
             return
-
-        usuarios = [os.path.splitext(f)[0] for f in os.listdir(pasta_cargo)
-                    if f.lower().endswith(('.jpg', '.png', '.jpeg'))]
         if not usuarios:
             QMessageBox.information(self, "Sem usuários", f"Não há usuários no {cargo}.")
             return
@@ -494,13 +579,15 @@ class FaceApp(QWidget):
         if not ok2:
             return
 
-        caminho_foto = os.path.join(pasta_cargo, f"{nome}.jpg")
-        if os.path.exists(caminho_foto):
-            os.remove(caminho_foto)
-            self.base_embeddings = carregar_base_embeddings()
+        try:
+            apagados = self.servico.remover(nome, cargo_norm)
+        except Exception as e:
+            QMessageBox.warning(self, "Erro", f"Falha ao remover: {e}")
+            return
+        if apagados:
             QMessageBox.information(self, "Sucesso", f"Usuário '{nome}' removido.")
         else:
-            QMessageBox.warning(self, "Erro", f"O arquivo '{nome}.jpg' não foi encontrado.")
+            QMessageBox.warning(self, "Erro", f"As fotos de '{nome}' não foram encontradas.")
 
     def cadastrar(self):
         nome = self.input_nome_cad.text().strip()
@@ -508,19 +595,54 @@ class FaceApp(QWidget):
         if not nome or not cargo:
             QMessageBox.warning(self, "Erro", "Preencha todos os campos!")
             return
-        if cadastrar_usuario(nome, cargo):
-            self.base_embeddings = carregar_base_embeddings()
-            QMessageBox.information(self, "Sucesso", f"Usuário {nome} cadastrado!")
+        try:
+            # Antes de abrir a câmera: nome que não serve de pasta nem chega a capturar
+            validar_usuario(nome, normalizar_nome(cargo))
+        except ValueError as e:
+            QMessageBox.warning(self, "Erro", str(e))
+            return
+        capturadas = capturar_amostras(self.pipeline)
+        if capturadas:
+            # Amostras ficam em usuarios/<nível>/<nome>/; um cadastro novo substitui o antigo.
+            # O serviço recorta pelas caixas já detectadas aqui, sem detectar de novo
+            amostras, faces = capturadas
+            try:
+                caminhos = self.servico.cadastrar(nome, normalizar_nome(cargo), amostras, faces)
+            except Exception as e:
+                QMessageBox.warning(self, "Erro", f"Falha ao cadastrar: {e}")
+                return
+            QMessageBox.information(self, "Sucesso", f"{len(caminhos)} fotos salvas. Usuário {nome} cadastrado!")
             self.voltar_login()
 
     def login_facial(self):
-        if not self.base_embeddings:
+        try:
+            total = self.servico.total_usuarios()
+        except Exception as e:
+            QMessageBox.warning(self, "Erro", str(e))
+            return
+        if not total:
             QMessageBox.warning(self, "Atenção", "Nenhum usuário cadastrado.")
             return
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
+        from captura import CapturaThread
+        from deteccao import DetectorRastreado
+        from qualidade import AvaliadorQualidade, JanelaMelhorFrame
+        # Leitura da câmera e detecção ficam fora da thread da interface
+        # Detector e avaliador são da sessão: uma captura antiga que ainda não
+        # terminou (parar() com timeout) segue usando os seus, sem cruzar com a nova
+        detector = DetectorRastreado(self.pipeline, DETECCAO_ESCALA, DETECCAO_PASSO)
+        avaliador = AvaliadorQualidade()
+        self.janela_qualidade = JanelaMelhorFrame(JANELA_QUALIDADE)
+        self.decisor.reiniciar()
+        self.captura = CapturaThread(FONTE_VIDEO, processar=functools.partial(analisar_frame, detector, avaliador),
+                                     ociosa=CAMERA_OCIOSA)
+        if not self.captura.aberta():
+            self.captura.parar()
+            self.captura = None
             QMessageBox.warning(self, "Erro", "Não foi possível abrir a câmera.")
             return
+        self.captura.start()
+        self.ultimo_seq = 0
+        self.sessao = self.executor.nova_sessao()
         self.reconhecendo = True
         self.timer.start(30)
         self.login_widget.setVisible(False)
@@ -528,47 +650,72 @@ class FaceApp(QWidget):
         self.lbl_bemvindo.setText("Reconhecendo rosto...")
 
     def atualizar_frame(self):
-        if not self.reconhecendo or not self.cap:
+        if not self.reconhecendo or not self.captura:
             return
-        ret, frame = self.cap.read()
-        if not ret:
+        # Só desenha o frame mais novo; se não chegou nenhum desde o último, não faz nada
+        item = self.captura.ultimo(self.ultimo_seq)
+        if item is None:
             return
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, 1.1, 5)
-        if faces is not None and len(faces) > 0 and (time.time() - self.last_process_time > 2):
-            self.last_process_time = time.time()
-            (x, y, w, h) = faces[0]
-            roi = frame[y:y + h, x:x + w]
-            threading.Thread(target=self.processar_face_thread, args=(roi,), daemon=True).start()
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb.shape
-        qt_img = QImage(rgb.data, w, h, ch * w, QImage.Format.Format_RGB888)
-        self.label_video.setPixmap(QPixmap.fromImage(qt_img))
-
-    def processar_face_thread(self, roi):
+        self.ultimo_seq, frame, (faces, pontuacao, motivo) = item
+        if faces and motivo is None:
+            self.lbl_bemvindo.setText("Reconhecendo rosto...")
+            melhor = self.janela_qualidade.oferecer(pontuacao, (frame, faces[0]), time.monotonic())
+            # Só manda o melhor rosto da janela, e só quando o anterior já foi processado.
+            # O worker reaproveita a caixa detectada aqui; não detecta de novo
+            if melhor is not None and not self.executor.pendentes():
+                if self.executor.submeter(self.sessao, *melhor) is not None:
+                    METRICAS.contar("rostos_enviados")
+        elif motivo:
+            METRICAS.contar(f"rejeitados_{motivo}")
+            self.lbl_bemvindo.setText(MENSAGENS_QUALIDADE[motivo])
+        self.preview.desenhar(frame)
+
+    def processar_face(self, frame, face):
+        # Roda num worker do executor. O serviço devolve o usuário realmente mais
+        # próximo; quem compara com o limiar é o DecisorTemporal
         try:
-            emb_frame = DeepFace.represent(roi, model_name="VGG-Face", enforce_detection=False)[0]["embedding"]
-        except:
-            nome, nivel = "Desconhecido", ""
+            with METRICAS.medir("identificacao"):
+                return self.servico.identificar(frame, face)
+        except Exception as e:
+            from servico import DESCONHECIDO
+            print(f"Erro ao identificar rosto: {e}")
+            return dict(DESCONHECIDO)
+
+    def atualizar_status_servico(self, ok, erro):
+        PARTIDA.marcar("pronto")
+        print(f"Partida: {PARTIDA.linha()}")
+        if ok:
+            from preview import RenderizadorPreview
+            self.preview = RenderizadorPreview(self.label_video)
+            for botao in (self.btn_login, self.btn_cadastrar, self.btn_remover):
+                botao.setEnabled(True)
+            self.lbl_status.setText("")
         else:
-            nome, nivel = "Desconhecido", ""
-            min_dist = THRESHOLD
-            for user in self.base_embeddings:
-                dist = cosine(emb_frame, user["embedding"])
-                if dist < min_dist:
-                    nome, nivel = user["nome"], user["Nível"]
-                    break
-        self.atualizar_frame_signal.emit({"nome": nome, "Nível": nivel})
+            # Sem modelo/galeria os botões continuam desligados
+            self.lbl_status.setText(f"Falha ao carregar o reconhecimento: {erro}\n"
+                                    "Verifique e abra o aplicativo novamente.")
+        if self.sair_quando_pronto:
+            print(json.dumps(PARTIDA.resumo(), ensure_ascii=False), flush=True)
+            self.close()
 
     def atualizar_frame_reconhecido(self, data):
-        nome, nivel = data["nome"], data["Nível"]
+        # Resultado de uma sessão já encerrada não abre o dashboard
+        if not self.reconhecendo or data["sessao"] != self.sessao:
+            return
+        # Só decide quando a soma dos últimos rostos for convincente; até lá a
+        # câmera continua aberta e mais rostos vão sendo enviados
+        decisao = self.decisor.adicionar((data["nome"], data["Nível"]), data["distancia"])
+        if decisao is None:
+            return
         self.parar_reconhecimento()
-        if nome != "Desconhecido":
+        METRICAS.contar("logins_aceitos" if decisao == "aceito" else "logins_negados")
+        if decisao == "aceito":
+            nome, nivel = self.decisor.usuario
             self.recon_widget.setVisible(False)
             nivel_norm = normalizar_nome(nivel)
             if self.dashboard_widget:
                 self.dashboard_widget.setParent(None)
-            self.dashboard_widget = Dashboard(nivel_norm, nome)
+            self.dashboard_widget = Dashboard(nivel_norm, nome, self.imagens)
             self.layout.addWidget(self.dashboard_widget)
             self.dashboard_widget.showFullScreen()
         else:
@@ -578,9 +725,11 @@ class FaceApp(QWidget):
 
     def parar_reconhecimento(self):
         self.reconhecendo = False
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        self.executor.cancelar()
+        self.sessao = None
+        if self.captura:
+            self.captura.parar()
+            self.captura = None
         self.timer.stop()
 
     def sair_reconhecimento(self):
@@ -590,6 +739,11 @@ class FaceApp(QWidget):
 
     def closeEvent(self, event):
         self.parar_reconhecimento()
+        self.executor.encerrar()
+        if self.log_metricas:
+            self.log_metricas.parar()
+        if self.servidor_metricas:
+            self.servidor_metricas.shutdown()
         event.accept()
 
     def keyPressEvent(self, event):
@@ -602,6 +756,7 @@ class FaceApp(QWidget):
 # ============================
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    janela = FaceApp()
+    # --medir-partida: fecha sozinho com o reconhecimento pronto e imprime o relatório (ver partida.py)
+    janela = FaceApp(sair_quando_pronto="--medir-partida" in sys.argv)
     janela.showFullScreen()
     sys.exit(app.exec())
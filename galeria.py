@@ -0,0 +1,86 @@
+import os
+import itertools
+import threading
+
+from comparador import Comparador
+from indice import IndiceFlat
+
+# ============================
+# Galeria de usuários em memória
+# ============================
+#
+# Compartilhada entre a interface e a thread de reconhecimento. Os escritores
+# (carregar/add/remove) são serializados por um lock e sempre publicam um
+# Comparador novo (registros + índice); os leitores só pegam a referência
+# atual, então nunca enxergam uma lista pela metade e não precisam de lock.
+#
+# ``gerar_embeddings(caminhos)`` recebe uma lista de fotos e devolve uma matriz
+# com um embedding por linha (uma chamada em lote ao modelo).
+
+
+class Galeria:
+    def __init__(self, cache, gerar_embeddings, criar_indice=IndiceFlat, agregacao="max"):
+        self.cache = cache
+        self.gerar_embeddings = gerar_embeddings
+        self.criar_indice = criar_indice
+        self.agregacao = agregacao
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._comparador = Comparador((), criar_indice=criar_indice, agregacao=agregacao)
+
+    def _com_id(self, registro):
+        return dict(registro, id=next(self._ids))
+
+    def carregar(self):
+        """Sincroniza com o cache em disco (só fotos novas/alteradas passam pelo modelo)
+        e reconstrói o índice do zero."""
+        with self._lock:
+            sincronizados = self.cache.sincronizar(lambda caminho: self.gerar_embeddings([caminho])[0])
+            self._comparador = Comparador([self._com_id(r) for r in sincronizados],
+                                          criar_indice=self.criar_indice, agregacao=self.agregacao)
+
+    def comparador(self):
+        return self._comparador
+
+    def registros(self):
+        return self._comparador.registros
+
+    def add(self, nome, nivel, caminhos, substituir=False, vetores=None):
+        """Inclui uma ou mais fotos do usuário com uma única chamada ao modelo.
+
+        Com ``substituir`` as fotos que o usuário já tinha saem na mesma troca.
+        ``vetores`` (um por foto) evita reler as fotos quando quem chama já tem
+        os embeddings, como o cadastro, que recorta pela caixa já detectada.
+        """
+        if isinstance(caminhos, str):
+            caminhos = [caminhos]
+        caminhos = [os.path.normpath(c) for c in caminhos]
+        if vetores is None:
+            vetores = self.gerar_embeddings(caminhos)
+        with self._lock:
+            saem = [
+                r for r in self.registros()
+                if r["caminho"] in caminhos or (substituir and r["nome"] == nome and r["Nível"] == nivel)
+            ]
+            antigos = [r["caminho"] for r in saem if r["caminho"] not in caminhos]
+            if antigos:
+                self.cache.remover(antigos)
+            novos = [
+                self._com_id(r)
+                for r in self.cache.adicionar_lote((c, nome, nivel, v) for c, v in zip(caminhos, vetores))
+            ]
+            self._comparador = self._comparador.alterado(novos, [r["id"] for r in saem])
+        return novos
+
+    def remove(self, nome, nivel):
+        """Tira todas as fotos do usuário no nível indicado; não chama o modelo."""
+        with self._lock:
+            removidos = [r for r in self.registros() if r["nome"] == nome and r["Nível"] == nivel]
+            if not removidos:
+                return 0
+            self.cache.remover([r["caminho"] for r in removidos])
+            self._comparador = self._comparador.alterado(ids_removidos=[r["id"] for r in removidos])
+        return len(removidos)
+
+    def __len__(self):
+        return len(self._comparador)
@@ -0,0 +1,96 @@
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPixmap
+
+# ============================
+# Cache de imagens da interface
+# ============================
+#
+# Fundo do login e imagens dos níveis: cada PNG é decodificado uma vez e cada
+# tamanho pedido é escalado uma vez. As entradas ficam num LRU por
+# (caminho, largura, altura, proporção) para que trocar de tela cheia para
+# janela e voltar, ou logar várias vezes, não decodifique nem escale de novo.
+#
+# QPixmap só pode ser criado na thread da interface. O pré-carregamento por
+# isso é em duas partes: decodificar() lê e escala em QImage (em qualquer
+# thread, sem tocar no cache) e guardar_imagens() converte e guarda, na thread
+# da interface.
+
+
+def _modo(manter_proporcao):
+    return Qt.AspectRatioMode.KeepAspectRatio if manter_proporcao else Qt.AspectRatioMode.IgnoreAspectRatio
+
+
+class CacheImagens:
+    def __init__(self, max_itens=16):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self.acertos = 0
+        self.faltas = 0
+
+    def _obter(self, chave):
+        pixmap = self._itens.get(chave)
+        if pixmap is not None:
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+        return pixmap
+
+    def _guardar(self, chave, pixmap):
+        self._itens[chave] = pixmap
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+        return pixmap
+
+    def original(self, caminho):
+        """QPixmap do arquivo no tamanho original; None se não existir/não abrir."""
+        chave = (caminho, None, None, None)
+        pixmap = self._obter(chave)
+        if pixmap is None:
+            if not os.path.exists(caminho):
+                return None
+            self.faltas += 1
+            pixmap = QPixmap(caminho)
+            if pixmap.isNull():
+                return None
+            self._guardar(chave, pixmap)
+        return pixmap
+
+    def escalada(self, caminho, largura, altura, manter_proporcao=True):
+        """Imagem escalada (suave) para largura x altura, vinda do cache se já existir."""
+        chave = (caminho, int(largura), int(altura), manter_proporcao)
+        pixmap = self._obter(chave)
+        if pixmap is None:
+            original = self.original(caminho)
+            if original is None:
+                return None
+            self.faltas += 1
+            pixmap = self._guardar(chave, original.scaled(int(largura), int(altura), _modo(manter_proporcao),
+                                                          Qt.TransformationMode.SmoothTransformation))
+        return pixmap
+
+    @staticmethod
+    def decodificar(pedidos):
+        """[(chave, QImage escalada)] para (caminho, largura, altura, manter_proporcao);
+        pode rodar fora da thread da interface. Arquivos ausentes ficam de fora."""
+        imagens = []
+        for caminho, largura, altura, manter_proporcao in pedidos:
+            imagem = QImage(caminho) if os.path.exists(caminho) else QImage()
+            if imagem.isNull():
+                continue
+            imagens.append(((caminho, int(largura), int(altura), manter_proporcao),
+                            imagem.scaled(int(largura), int(altura), _modo(manter_proporcao),
+                                          Qt.TransformationMode.SmoothTransformation)))
+        return imagens
+
+    def guardar_imagens(self, imagens):
+        """Guarda o resultado de decodificar() como QPixmap (só na thread da interface)."""
+        for chave, imagem in imagens:
+            if chave not in self._itens:
+                self._guardar(chave, QPixmap.fromImage(imagem))
+
+    def precarregar(self, pedidos):
+        """Aquece o cache com (caminho, largura, altura, manter_proporcao)."""
+        self.guardar_imagens(self.decodificar(pedidos))
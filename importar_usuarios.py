@@ -0,0 +1,195 @@
+import os
+import csv
+import sys
+import time
+import shutil
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import DB_PATH, CACHE_PATH, MODELO, PRECISAO_GALERIA
+from cache_embeddings import CacheEmbeddings, EXTENSOES_IMAGEM
+from catalogo import CatalogoUsuarios
+from servico import apagar_fotos, caminhos_livres
+from util import normalizar_nome, validar_usuario
+
+# ============================
+# Importação em lote de usuários (sem interface)
+# ============================
+#
+# Uso:
+#   python importar_usuarios.py fotos/              (fotos/<nível>/<nome>.jpg)
+#   python importar_usuarios.py fotos/ --nivel "Nível 2"
+#   python importar_usuarios.py lista.csv           (colunas: caminho,nome,nivel)
+#   python importar_usuarios.py fotos/ --substituir (troca o cadastro de quem já existe)
+#
+# Cada processo do pool carrega o modelo uma vez e recebe lotes de fotos:
+# detecta/alinha o rosto de cada uma e gera os embeddings do lote numa única
+# inferência. As fotos aceitas são copiadas para usuarios/<nível>/<nome>/<n>.<ext>
+# (uma pasta por usuário, como no cadastro pelo app, sem sobrescrever nada) e
+# cada lote que termina já entra no catálogo de usuários e no cache de
+# embeddings: o app não recalcula nada ao abrir, e uma importação interrompida
+# não deixa fotos copiadas que ninguém conhece. Nomes que não servem de pasta
+# (vazio, "..", com barras), usuários já cadastrados (sem --substituir) e
+# erros ao copiar entram nas falhas sem parar a importação.
+
+_pipeline = None
+
+
+def _iniciar_worker(nome_modelo):
+    global _pipeline
+    from modelo import GerenciadorModelo
+    from pipeline import PipelineRosto
+    modelo = GerenciadorModelo.instancia(nome_modelo)
+    modelo.carregar()
+    _pipeline = PipelineRosto(modelo)
+
+
+def _processar_lote(itens):
+    """Roda no worker: devolve (índices aceitos, vetores, [(índice, erro)])."""
+    aceitos, preparados, falhas = [], [], []
+    for i, caminho in itens:
+        try:
+            recorte = _pipeline.recortar_imagem(caminho, exigir_rosto=True)
+            preparados.append(_pipeline.modelo.preparar(recorte))
+            aceitos.append(i)
+        except Exception as e:
+            falhas.append((i, str(e)))
+    vetores = _pipeline.modelo.inferir(np.stack(preparados)) if preparados else None
+    return aceitos, vetores, falhas
+
+
+def ler_entradas(origem, nivel=None):
+    """Lista de (caminho, nome, nível) a partir de uma pasta ou de um CSV."""
+    entradas = []
+    if origem.lower().endswith(".csv"):
+        base = os.path.dirname(os.path.abspath(origem))
+        with open(origem, newline="", encoding="utf-8-sig") as f:
+            for linha in csv.DictReader(f):
+                caminho = linha["caminho"].strip()
+                if not os.path.isabs(caminho):
+                    caminho = os.path.join(base, caminho)
+                entradas.append((caminho, linha["nome"].strip(), linha.get("nivel") or nivel or ""))
+        return entradas
+
+    for root, dirs, files in os.walk(origem):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.lower().endswith(EXTENSOES_IMAGEM):
+                continue
+            nivel_arquivo = nivel or (os.path.basename(root) if root != origem else "")
+            entradas.append((os.path.join(root, file), os.path.splitext(file)[0], nivel_arquivo))
+    return entradas
+
+
+def validar(entradas, catalogo=None, substituir=False):
+    """Separa entradas válidas (com nível normalizado) das inválidas.
+
+    Com ``catalogo``, usuários que já existem são falhas, a não ser com ``substituir``.
+    """
+    validas, falhas, vistos = [], [], set()
+    for caminho, nome, nivel in entradas:
+        nivel_norm = normalizar_nome(nivel.strip())
+        try:
+            validar_usuario(nome, nivel_norm)
+        except ValueError as e:
+            falhas.append((caminho, str(e)))
+            continue
+        if not os.path.exists(caminho):
+            falhas.append((caminho, "arquivo não encontrado"))
+        elif (nome, nivel_norm) in vistos:
+            falhas.append((caminho, f"usuário repetido: {nome} ({nivel_norm})"))
+        elif catalogo is not None and not substituir and catalogo.obter(nome, nivel_norm) is not None:
+            falhas.append((caminho, f"usuário já cadastrado: {nome} ({nivel_norm}); use --substituir"))
+        else:
+            vistos.add((nome, nivel_norm))
+            validas.append((caminho, nome, nivel_norm))
+    return validas, falhas
+
+
+def gravar_lote(itens, catalogo, cache, substituir=False):
+    """Registra no catálogo e no cache as fotos ``(destino, nome, nível, vetor)`` já
+    copiadas; com ``substituir`` as fotos antigas desses usuários saem, como no cadastro."""
+    antigas = {(nome, nivel): catalogo.fotos(nome, nivel) for _, nome, nivel, _ in itens} if substituir else {}
+    # Catálogo antes do cache: é nele que o cache grava a linha de cada foto
+    catalogo.adicionar_fotos(((nome, nivel, destino) for destino, nome, nivel, _ in itens), substituir)
+    cache.adicionar_lote(itens)
+    for (nome, nivel), fotos in antigas.items():
+        if fotos:
+            cache.remover(fotos)
+            apagar_fotos(fotos, os.path.join(catalogo.db_path, nivel, nome))
+
+
+def importar(entradas, workers=2, tamanho_lote=32, db_path=DB_PATH, cache_path=CACHE_PATH, modelo=MODELO,
+             substituir=False):
+    """Importa as entradas e devolve um resumo com vazão e falhas por arquivo."""
+    inicio = time.perf_counter()
+    catalogo = CatalogoUsuarios(db_path)
+    cache = CacheEmbeddings(db_path, cache_path, modelo, PRECISAO_GALERIA, catalogo)
+    validas, falhas = validar(entradas, catalogo, substituir)
+    indexados = [(i, caminho) for i, (caminho, _, _) in enumerate(validas)]
+    lotes = [indexados[i:i + tamanho_lote] for i in range(0, len(indexados), tamanho_lote)]
+
+    importados = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker, initargs=(modelo,)) as pool:
+            futuros = [pool.submit(_processar_lote, lote) for lote in lotes]
+            for futuro in as_completed(futuros):
+                aceitos, vetores, falhas_lote = futuro.result()
+                falhas.extend((validas[i][0], erro) for i, erro in falhas_lote)
+                itens = []
+                for i, vetor in zip(aceitos, vetores if vetores is not None else []):
+                    caminho, nome, nivel = validas[i]
+                    pasta = os.path.join(db_path, nivel, nome)
+                    try:
+                        os.makedirs(pasta, exist_ok=True)
+                        destino = next(caminhos_livres(pasta, os.path.splitext(caminho)[1].lower()))
+                        shutil.copy2(caminho, destino)
+                    except OSError as e:
+                        falhas.append((caminho, f"erro ao copiar: {e}"))
+                        continue
+                    itens.append((destino, nome, nivel, vetor))
+                # Cada lote fica completo (arquivo, catálogo e cache) antes do próximo
+                if itens:
+                    gravar_lote(itens, catalogo, cache, substituir)
+                    importados += len(itens)
+                print(f"{importados} importados, {len(falhas)} falhas...", file=sys.stderr)
+    finally:
+        catalogo.fechar()
+    duracao = time.perf_counter() - inicio
+    return {
+        "total": len(entradas),
+        "importados": importados,
+        "falhas": falhas,
+        "duracao_s": duracao,
+        "imagens_por_s": importados / duracao if duracao > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa fotos de usuários em lote.")
+    parser.add_argument("origem", help="pasta com fotos ou CSV (caminho,nome,nivel)")
+    parser.add_argument("--nivel", help="nível para todas as fotos (ex: 'Nível 1')")
+    parser.add_argument("--workers", type=int, default=2, help="processos com o modelo carregado")
+    parser.add_argument("--lote", type=int, default=32, help="fotos por inferência")
+    parser.add_argument("--falhas", help="grava as falhas neste CSV")
+    parser.add_argument("--substituir", action="store_true",
+                        help="usuários já cadastrados têm as fotos trocadas pelas importadas")
+    args = parser.parse_args(argv)
+
+    resumo = importar(ler_entradas(args.origem, args.nivel), args.workers, args.lote,
+                      substituir=args.substituir)
+    for caminho, erro in resumo["falhas"]:
+        print(f"FALHA {caminho}: {erro}")
+    if args.falhas:
+        with open(args.falhas, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["caminho", "erro"])
+            escritor.writerows(resumo["falhas"])
+    print(f"{resumo['importados']}/{resumo['total']} importados em {resumo['duracao_s']:.1f} s "
+          f"({resumo['imagens_por_s']:.1f} imagens/s), {len(resumo['falhas'])} falhas")
+    return 0 if not resumo["falhas"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+import sys
+import copy
+import json
+import time
+import argparse
+import numpy as np
+
+from quantizacao import MatrizQuantizada
+
+# ============================
+# Índices de busca para a galeria
+# ============================
+#
+# Todos os índices trabalham com vetores normalizados e distância de cosseno
+# e têm a mesma interface:
+#   construir(vetores, ids)   -> monta o índice do zero (altera o objeto)
+#   adicionar(vetores, ids)   -> devolve um índice novo com os vetores incluídos
+#   remover(ids)              -> devolve um índice novo sem esses ids
+#   buscar(consultas, k)      -> (distâncias [n, k], ids [n, k])
+#   vetores(ids)              -> vetores normalizados (float32) desses ids, na ordem de ``ids``
+#   todos()                   -> (vetores, ids) de tudo que está no índice
+# adicionar/remover não mexem no índice original, assim a galeria pode trocar a
+# referência de uma vez enquanto a thread de reconhecimento ainda usa o antigo.
+# Quando há menos de k candidatos o resultado é completado com inf / -1.
+# ``precisao`` escolhe como os vetores ficam guardados ("float32", "float16" ou
+# "int8", ver quantizacao.py); a busca é feita sobre os vetores quantizados.
+
+
+def normalizar_linhas(matriz):
+    matriz = np.asarray(matriz, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+def _na_ordem(achados, ids):
+    """Posições em ``achados`` de cada id de ``ids`` (todos presentes)."""
+    ordem = np.argsort(achados, kind="stable")
+    return ordem[np.searchsorted(achados, np.asarray(ids, dtype=np.int64), sorter=ordem)]
+
+
+def _top_k(dist, ids, k):
+    n, total = dist.shape
+    k_real = min(k, total)
+    if k_real < total:
+        idx = np.argpartition(dist, k_real - 1, axis=1)[:, :k_real]
+    else:
+        idx = np.broadcast_to(np.arange(total), (n, total))
+    d = np.take_along_axis(dist, idx, axis=1)
+    ordem = np.argsort(d, axis=1, kind="stable")
+    idx = np.take_along_axis(idx, ordem, axis=1)
+    d = np.take_along_axis(d, ordem, axis=1)
+    resultado_ids = ids[idx]
+    if k_real < k:
+        d = np.hstack([d, np.full((n, k - k_real), np.inf, dtype=d.dtype)])
+        resultado_ids = np.hstack([resultado_ids, np.full((n, k - k_real), -1, dtype=np.int64)])
+    return d, resultado_ids
+
+
+class IndiceFlat:
+    """Busca exata: compara a consulta com todos os vetores."""
+    nome = "flat"
+
+    def __init__(self, precisao="float32"):
+        self.precisao = precisao
+        self.matriz = MatrizQuantizada.vazia(precisao=precisao)
+        self.ids = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def construir(self, vetores, ids):
+        self.matriz = MatrizQuantizada.de(normalizar_linhas(vetores), self.precisao)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        return self
+
+    def adicionar(self, vetores, ids):
+        novo = copy.copy(self)
+        vetores = MatrizQuantizada.de(normalizar_linhas(np.atleast_2d(vetores)), self.precisao)
+        novo.matriz = self.matriz.juntar(vetores)
+        novo.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        return novo
+
+    def remover(self, ids):
+        novo = copy.copy(self)
+        manter = ~np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+        novo.matriz = self.matriz.linhas(manter)
+        novo.ids = self.ids[manter]
+        return novo
+
+    def vetores(self, ids):
+        linhas = np.flatnonzero(np.isin(self.ids, ids))
+        return self.matriz.reconstruir(linhas[_na_ordem(self.ids[linhas], ids)])
+
+    def todos(self):
+        return self.matriz.reconstruir(), self.ids
+
+    def buscar(self, consultas, k=1):
+        consultas = normalizar_linhas(np.atleast_2d(consultas))
+        if not len(self.ids):
+            return _top_k(np.zeros((len(consultas), 0), dtype=np.float32), self.ids, k)
+        dist = 1.0 - self.matriz.similaridades(consultas)
+        return _top_k(dist, self.ids, k)
+
+
+class IndiceIVF:
+    """Busca aproximada por listas invertidas (IVF) com k-means esférico.
+
+    Os vetores são agrupados em ``n_listas`` centróides; cada consulta só é
+    comparada com os vetores das ``n_sondas`` listas mais próximas. Mais sondas
+    = mais recall e mais latência (use o relatório deste módulo para escolher).
+    Inclusões depois de construir vão para a lista do centróide mais próximo;
+    se a galeria mudar muito, vale reconstruir.
+    """
+    nome = "ivf"
+
+    def __init__(self, n_listas=None, n_sondas=8, iteracoes=10, semente=0, amostra_por_lista=256,
+                 precisao="float32"):
+        self.precisao = precisao
+        self.n_listas = n_listas
+        self.n_sondas = n_sondas
+        self.iteracoes = iteracoes
+        self.semente = semente
+        self.amostra_por_lista = amostra_por_lista
+        self.centroides = None
+        self.listas = []
+        self.ids_listas = []
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.ids_listas)
+
+    def _atribuir(self, vetores, bloco=8192):
+        atrib = np.empty(len(vetores), dtype=np.int64)
+        for i in range(0, len(vetores), bloco):
+            atrib[i:i + bloco] = np.argmax(vetores[i:i + bloco] @ self.centroides.T, axis=1)
+        return atrib
+
+    def _kmeans(self, vetores, n_listas):
+        rng = np.random.default_rng(self.semente)
+        amostra = vetores
+        limite = n_listas * self.amostra_por_lista
+        if len(vetores) > limite:
+            amostra = vetores[rng.choice(len(vetores), limite, replace=False)]
+        self.centroides = amostra[rng.choice(len(amostra), n_listas, replace=False)].copy()
+        for _ in range(self.iteracoes):
+            atrib = self._atribuir(amostra)
+            somas = np.zeros_like(self.centroides)
+            np.add.at(somas, atrib, amostra)
+            vazios = np.bincount(atrib, minlength=n_listas) == 0
+            # Centróides que ficaram sem pontos mantêm a posição anterior
+            somas[vazios] = self.centroides[vazios]
+            self.centroides = normalizar_linhas(somas)
+
+    def construir(self, vetores, ids):
+        vetores = normalizar_linhas(vetores)
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(vetores):
+            self.centroides = None
+            self.listas, self.ids_listas = [], []
+            return self
+        n_listas = self.n_listas or int(np.sqrt(len(vetores)))
+        n_listas = max(1, min(n_listas, len(vetores)))
+        self._kmeans(vetores, n_listas)
+        atrib = self._atribuir(vetores)
+        # Centróides ficam em float32; só os vetores das listas são quantizados
+        quantizados = MatrizQuantizada.de(vetores, self.precisao)
+        self.listas = [quantizados.linhas(atrib == c) for c in range(n_listas)]
+        self.ids_listas = [ids[atrib == c] for c in range(n_listas)]
+        return self
+
+    def adicionar(self, vetores, ids):
+        if self.centroides is None:
+            return copy.copy(self).construir(vetores, ids)
+        novo = copy.copy(self)
+        novo.listas = list(self.listas)
+        novo.ids_listas = list(self.ids_listas)
+        vetores = normalizar_linhas(np.atleast_2d(vetores))
+        ids = np.asarray(ids, dtype=np.int64)
+        atrib = self._atribuir(vetores)
+        quantizados = MatrizQuantizada.de(vetores, self.precisao)
+        for c in np.unique(atrib):
+            novo.listas[c] = self.listas[c].juntar(quantizados.linhas(atrib == c))
+            novo.ids_listas[c] = np.concatenate([self.ids_listas[c], ids[atrib == c]])
+        return novo
+
+    def remover(self, ids):
+        novo = copy.copy(self)
+        novo.listas = list(self.listas)
+        novo.ids_listas = list(self.ids_listas)
+        ids = np.asarray(ids, dtype=np.int64)
+        for c, ids_lista in enumerate(self.ids_listas):
+            manter = ~np.isin(ids_lista, ids)
+            if not manter.all():
+                novo.listas[c] = self.listas[c].linhas(manter)
+                novo.ids_listas[c] = ids_lista[manter]
+        return novo
+
+    def vetores(self, ids):
+        partes, achados = [], []
+        for lista, ids_lista in zip(self.listas, self.ids_listas):
+            linhas = np.flatnonzero(np.isin(ids_lista, ids))
+            partes.append(lista.reconstruir(linhas))
+            achados.append(ids_lista[linhas])
+        if not partes:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(partes)[_na_ordem(np.concatenate(achados), ids)]
+
+    def todos(self):
+        if not self.listas:
+            return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        return (np.vstack([lista.reconstruir() for lista in self.listas]),
+                np.concatenate(self.ids_listas))
+
+    def buscar(self, consultas, k=1):
+        consultas = normalizar_linhas(np.atleast_2d(consultas))
+        if self.centroides is None:
+            return IndiceFlat(self.precisao).buscar(consultas, k)
+        n_sondas = min(self.n_sondas, len(self.centroides))
+        sondas = np.argpartition(-(consultas @ self.centroides.T), n_sondas - 1, axis=1)[:, :n_sondas]
+        distancias = np.empty((len(consultas), k), dtype=np.float32)
+        resultado_ids = np.empty((len(consultas), k), dtype=np.int64)
+        for i, (consulta, listas) in enumerate(zip(consultas, sondas)):
+            ids = np.concatenate([self.ids_listas[c] for c in listas])
+            if len(ids):
+                dist = 1.0 - np.concatenate([self.listas[c].similaridades(consulta)[0] for c in listas])
+            else:
+                dist = np.zeros(0, dtype=np.float32)
+            d, r = _top_k(dist[np.newaxis], ids, k)
+            distancias[i], resultado_ids[i] = d[0], r[0]
+        return distancias, resultado_ids
+
+
+INDICES = {"flat": IndiceFlat, "ivf": IndiceIVF}
+
+
+def criar_indice(tipo="flat", **opcoes):
+    try:
+        return INDICES[tipo](**opcoes)
+    except KeyError:
+        raise ValueError(f"Tipo de índice desconhecido: {tipo}")
+
+
+# ============================
+# Relatório recall x latência
+# ============================
+
+def gerar_base_sintetica(n_usuarios, dim=4096, ruido=0.5, semente=0):
+    """Galeria sintética agrupada (como rostos parecidos) e um gerador de
+    consultas, que são versões ruidosas de usuários da galeria."""
+    rng = np.random.default_rng(semente)
+    n_grupos = max(1, int(np.sqrt(n_usuarios)))
+    centros = rng.standard_normal((n_grupos, dim), dtype=np.float32)
+    base = centros[rng.integers(0, n_grupos, n_usuarios)]
+    base += rng.standard_normal((n_usuarios, dim), dtype=np.float32)
+
+    def gerar_consultas(n):
+        escolhidos = base[rng.integers(0, n_usuarios, n)]
+        return escolhidos + ruido * rng.standard_normal((n, dim), dtype=np.float32)
+    return base, gerar_consultas
+
+
+def relatorio_recall_latencia(vetores, consultas, k=1, listas=(None,), sondas=(1, 4, 8, 16, 32)):
+    """Mede recall@k do IVF contra a busca exata e a latência por consulta."""
+    ids = np.arange(len(vetores))
+    resultados = []
+
+    inicio = time.perf_counter()
+    flat = IndiceFlat().construir(vetores, ids)
+    construcao = time.perf_counter() - inicio
+    tempos = []
+    verdade = []
+    for consulta in consultas:
+        t = time.perf_counter()
+        verdade.append(flat.buscar(consulta, k)[1][0])
+        tempos.append(time.perf_counter() - t)
+    resultados.append(_linha_relatorio("flat", None, None, 1.0, tempos, construcao))
+
+    for n_listas in listas:
+        inicio = time.perf_counter()
+        ivf = IndiceIVF(n_listas=n_listas).construir(vetores, ids)
+        construcao = time.perf_counter() - inicio
+        for n_sondas in sondas:
+            if n_sondas > len(ivf.centroides):
+                continue
+            ivf.n_sondas = n_sondas
+            tempos = []
+            acertos = 0
+            for consulta, esperado in zip(consultas, verdade):
+                t = time.perf_counter()
+                encontrados = ivf.buscar(consulta, k)[1][0]
+                tempos.append(time.perf_counter() - t)
+                acertos += len(np.intersect1d(encontrados, esperado))
+            recall = acertos / (len(consultas) * min(k, len(vetores)))
+            resultados.append(_linha_relatorio("ivf", len(ivf.centroides), n_sondas, recall, tempos, construcao))
+    return resultados
+
+
+def _linha_relatorio(tipo, n_listas, n_sondas, recall, tempos, construcao):
+    tempos = np.asarray(tempos) * 1000
+    return {
+        "indice": tipo,
+        "listas": n_listas,
+        "sondas": n_sondas,
+        "recall": round(float(recall), 4),
+        "latencia_p50_ms": round(float(np.percentile(tempos, 50)), 3),
+        "latencia_p95_ms": round(float(np.percentile(tempos, 95)), 3),
+        "construcao_s": round(construcao, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recall x latência dos índices da galeria.")
+    parser.add_argument("--base", help="matriz .npy de embeddings (ex: cache_embeddings/vgg-face.npy)")
+    parser.add_argument("--usuarios", type=int, default=10000, help="tamanho da galeria sintética")
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=1)
+    parser.add_argument("--listas", type=int, nargs="+", default=[None])
+    parser.add_argument("--sondas", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args(argv)
+
+    if args.base:
+        vetores = np.load(args.base).astype(np.float32)
+        rng = np.random.default_rng(0)
+        consultas = vetores[rng.integers(0, len(vetores), args.consultas)]
+        consultas = consultas + 0.5 * vetores.std() * rng.standard_normal(consultas.shape, dtype=np.float32)
+    else:
+        vetores, gerar_consultas = gerar_base_sintetica(args.usuarios, args.dim)
+        consultas = gerar_consultas(args.consultas)
+
+    linhas = relatorio_recall_latencia(vetores, consultas, args.k, args.listas, args.sondas)
+    if args.json:
+        json.dump(linhas, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{len(vetores)} vetores de dim {vetores.shape[1]}, {len(consultas)} consultas, k={args.k}")
+    print(f"{'índice':<6} {'listas':>6} {'sondas':>6} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'constr. s':>9}")
+    for l in linhas:
+        print(f"{l['indice']:<6} {l['listas'] or '-':>6} {l['sondas'] or '-':>6} {l['recall']:>7.4f} "
+              f"{l['latencia_p50_ms']:>8.3f} {l['latencia_p95_ms']:>8.3f} {l['construcao_s']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
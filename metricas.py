@@ -0,0 +1,157 @@
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# ============================
+# Métricas do caminho quente
+# ============================
+#
+# Tempos (spans) e contadores leves o bastante para ficarem sempre ligados:
+# registrar um tempo é uma soma e uma escrita num buffer circular dentro de um
+# lock; percentis só são calculados quando alguém pede o resumo().
+#
+#   with METRICAS.medir("embedding"): ...
+#   METRICAS.contar("frames_descartados")
+#
+# O resumo sai por LogMetricas (uma linha JSON a cada N segundos), pela rota
+# /metricas do servidor.py ou por servir_metricas() (só a rota /metricas).
+# NumPy e http.server só são importados quando usados: este módulo entra na
+# partida do front.py.
+#
+# Tempos registrados:   captura, deteccao, deteccao_<modo> (deteccao.py), recorte,
+#                       embedding, busca, identificacao (pedido inteiro, inclui rede com servidor), render
+# Contadores:           frames_lidos, frames_descartados, falhas_camera,
+#                       rostos_enviados, pedidos_descartados, rejeitados_<motivo>,
+#                       identificacoes, logins_aceitos, logins_negados,
+#                       lotes, rostos_em_lotes (executor.ExecutorLotes, modo várias portas),
+#                       reinicios_modelo (modelo_processos.py), preview_pulados (preview.py)
+
+
+class _Tempos:
+    __slots__ = ("n", "total", "maximo", "valores", "posicao")
+
+    def __init__(self, janela):
+        self.n = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.valores = [0.0] * janela
+        self.posicao = 0
+
+
+class Metricas:
+    def __init__(self, janela=1024):
+        # Percentis são dos últimos ``janela`` tempos de cada span; n/média são do total
+        self.janela = janela
+        self._lock = threading.Lock()
+        self._tempos = {}
+        self._contadores = {}
+        self.inicio = time.time()
+
+    def contar(self, nome, n=1):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + n
+
+    def registrar(self, nome, segundos):
+        with self._lock:
+            tempos = self._tempos.get(nome)
+            if tempos is None:
+                tempos = self._tempos[nome] = _Tempos(self.janela)
+            tempos.n += 1
+            tempos.total += segundos
+            if segundos > tempos.maximo:
+                tempos.maximo = segundos
+            tempos.valores[tempos.posicao] = segundos
+            tempos.posicao = (tempos.posicao + 1) % self.janela
+
+    @contextmanager
+    def medir(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nome, time.perf_counter() - inicio)
+
+    def resumo(self):
+        import numpy as np
+        with self._lock:
+            contadores = dict(self._contadores)
+            copias = {nome: (t.n, t.total, t.maximo, t.valores[:min(t.n, self.janela)])
+                      for nome, t in self._tempos.items()}
+        tempos = {}
+        for nome, (n, total, maximo, valores) in copias.items():
+            p50, p95, p99 = np.percentile(np.asarray(valores) * 1000, (50, 95, 99))
+            tempos[nome] = {
+                "n": n,
+                "media_ms": round(total / n * 1000, 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(maximo * 1000, 3),
+            }
+        return {"tempo_ativo_s": round(time.time() - self.inicio, 1), "contadores": contadores, "tempos": tempos}
+
+    def zerar(self):
+        with self._lock:
+            self._tempos.clear()
+            self._contadores.clear()
+            self.inicio = time.time()
+
+
+# Instância única do processo
+METRICAS = Metricas()
+
+
+class LogMetricas(threading.Thread):
+    """Escreve o resumo das métricas como uma linha JSON a cada ``intervalo`` segundos."""
+
+    def __init__(self, metricas=METRICAS, intervalo=60.0, caminho=None):
+        super().__init__(name="log-metricas", daemon=True)
+        self.metricas = metricas
+        self.intervalo = intervalo
+        self.caminho = caminho
+        self._parar = threading.Event()
+
+    def escrever(self):
+        linha = json.dumps(dict(self.metricas.resumo(), momento=time.strftime("%Y-%m-%dT%H:%M:%S")),
+                           ensure_ascii=False)
+        if self.caminho:
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(linha + "\n")
+        else:
+            print(linha, file=sys.stderr)
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            self.escrever()
+
+    def parar(self):
+        self._parar.set()
+        # Última linha com o que aconteceu desde o último intervalo
+        self.escrever()
+
+
+def servir_metricas(porta, host="127.0.0.1", metricas=METRICAS):
+    """Sobe um servidor HTTP só com GET /metricas numa thread; devolve o servidor."""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metricas":
+                self.send_error(404)
+                return
+            corpo = json.dumps(metricas.resumo(), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, porta), Manipulador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+    return servidor
@@ -0,0 +1,109 @@
+import threading
+import cv2
+import numpy as np
+
+from metricas import METRICAS
+from partida import PARTIDA
+
+# ============================
+# Gerenciador do modelo de reconhecimento
+# ============================
+#
+# Uma instância por modelo no processo. O modelo é carregado uma única vez
+# (de preferência em segundo plano, na abertura do app) e aquecido com uma
+# inferência vazia para o TensorFlow montar o grafo antes do primeiro login.
+# Todo embedding passa por embed(lote), que faz uma só chamada ao modelo para
+# o lote inteiro. As imagens já chegam recortadas no rosto (ver pipeline.py).
+# O DeepFace (e o TensorFlow com ele) só é importado na carga, não junto com
+# este módulo.
+
+
+class GerenciadorModelo:
+    _instancias = {}
+    _lock_instancias = threading.Lock()
+
+    @classmethod
+    def instancia(cls, nome="VGG-Face"):
+        with cls._lock_instancias:
+            if nome not in cls._instancias:
+                cls._instancias[nome] = cls(nome)
+            return cls._instancias[nome]
+
+    def __init__(self, nome):
+        self.nome = nome
+        self._modelo = None
+        self._erro = None
+        self._pronto = threading.Event()
+        self._lock_carga = threading.Lock()
+        self._lock_inferencia = threading.Lock()
+        self._thread = None
+
+    def carregar_em_segundo_plano(self, ao_terminar=None):
+        """Dispara a carga numa thread; ``ao_terminar(ok, erro)`` é chamado no fim."""
+        def carregar():
+            self.carregar()
+            if ao_terminar:
+                ao_terminar(self._erro is None, str(self._erro or ""))
+        with self._lock_carga:
+            if self._thread is None:
+                self._thread = threading.Thread(target=carregar, name="carga-modelo", daemon=True)
+                self._thread.start()
+
+    def carregar(self):
+        with self._lock_carga:
+            if self._pronto.is_set():
+                return
+            try:
+                with PARTIDA.etapa("import deepface"):
+                    from deepface import DeepFace
+                self._modelo = DeepFace.build_model(self.nome)
+                # Inferência de aquecimento
+                alvo_h, alvo_w = self.tamanho_entrada()
+                self._modelo.model(np.zeros((1, alvo_h, alvo_w, 3), dtype=np.float32), training=False)
+            except Exception as e:
+                self._erro = e
+                print(f"Erro ao carregar o modelo {self.nome}: {e}")
+            self._pronto.set()
+
+    def pronto(self):
+        return self._pronto.is_set() and self._erro is None
+
+    def aguardar(self, timeout=None):
+        """Espera a carga terminar (carregando aqui mesmo se ninguém começou)."""
+        if self._thread is None and not self._pronto.is_set():
+            self.carregar()
+        if not self._pronto.wait(timeout):
+            return False
+        if self._erro is not None:
+            raise RuntimeError(f"Modelo {self.nome} indisponível: {self._erro}")
+        return True
+
+    def tamanho_entrada(self):
+        return tuple(self._modelo.input_shape)
+
+    def _redimensionar(self, rosto):
+        # Mesmo pré-processamento do DeepFace: mantém a proporção e completa com preto
+        alvo_h, alvo_w = self.tamanho_entrada()
+        h, w = rosto.shape[:2]
+        fator = min(alvo_h / h, alvo_w / w)
+        rosto = cv2.resize(rosto, (max(1, int(w * fator)), max(1, int(h * fator))))
+        dh, dw = alvo_h - rosto.shape[0], alvo_w - rosto.shape[1]
+        return np.pad(rosto, ((dh // 2, dh - dh // 2), (dw // 2, dw - dw // 2), (0, 0)))
+
+    def preparar(self, rosto):
+        """Deixa um recorte de rosto BGR uint8 no formato de entrada do modelo."""
+        self.aguardar()
+        return self._redimensionar(rosto.astype(np.float32) / 255)
+
+    def inferir(self, entrada):
+        """Uma chamada ao modelo para um lote já preparado (N, h, w, 3)."""
+        self.aguardar()
+        with self._lock_inferencia, METRICAS.medir("embedding"):
+            saida = self._modelo.model(entrada, training=False)
+        return np.asarray(saida, dtype=np.float32).reshape(len(entrada), -1)
+
+    def embed(self, lote):
+        """Embeddings (float32, uma linha por rosto) de um lote de recortes BGR."""
+        if not len(lote):
+            return np.zeros((0, 0), dtype=np.float32)
+        return self.inferir(np.stack([self.preparar(rosto) for rosto in lote]))
@@ -0,0 +1,327 @@
+import sys
+import types
+import atexit
+import threading
+import contextlib
+import multiprocessing
+from queue import Queue, Empty
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+from metricas import METRICAS
+
+# ============================
+# Modelo em processos separados
+# ============================
+#
+# Mesma interface do GerenciadorModelo (embed, carregar_em_segundo_plano,
+# pronto, aguardar), mas o DeepFace/TensorFlow roda em ``n_processos``
+# processos próprios: redimensionamento, inferência e pós-processamento não
+# disputam o GIL com a interface (Qt) nem com a captura/detecção (OpenCV).
+# Nem o TensorFlow é importado no processo principal.
+#
+# Cada worker tem um bloco de memória compartilhada: os recortes BGR são
+# copiados para lá e só as formas (offset, h, w) passam pelo pipe; os
+# embeddings voltam pelo mesmo bloco. Nada de imagem é serializado com pickle.
+# Quem cria o bloco (o processo principal) é quem o apaga: o filho só o abre,
+# sem registrá-lo no resource_tracker.
+#
+# Os filhos são criados com "spawn" sem o __main__ do programa (front.py com o
+# PyQt, servidor.py...): só este módulo e o modelo são importados lá.
+#
+# Saúde: um vigia verifica a cada ``intervalo_saude`` segundos se cada worker
+# está vivo e, se estiver livre, se responde a um ping. Um worker que morreu,
+# travou ou passou de ``timeout`` numa inferência é encerrado e substituído
+# (o lote que estava com ele falha com RuntimeError e o próximo vai para
+# outro worker). Um worker que nem chegou a carregar o modelo não é reiniciado:
+# o erro sai em aguardar(), como no GerenciadorModelo.
+
+CAPACIDADE_INICIAL = 8 * 2 ** 20
+
+
+def _anexar_memoria(nome):
+    """Abre no filho um bloco criado pelo processo principal, sem registrá-lo."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=nome, track=False)
+    # Antes do 3.13 não há track=False. Desregistrar depois de abrir não serve:
+    # com spawn o tracker é o mesmo do processo principal, e o registro dele
+    # sairia junto (o unlink de lá acusaria bloco desconhecido)
+    registrar = resource_tracker.register
+    resource_tracker.register = lambda nome, tipo: None
+    try:
+        return shared_memory.SharedMemory(name=nome)
+    finally:
+        resource_tracker.register = registrar
+
+
+_lock_main = threading.Lock()
+
+
+@contextlib.contextmanager
+def _sem_main_do_programa():
+    """Esconde o __main__ enquanto um filho "spawn" é criado, para ele não ser
+    importado de novo lá (o alvo do filho é deste módulo, não precisa dele)."""
+    with _lock_main:
+        principal = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = principal
+
+
+def _principal_worker(nome, conexao):
+    """Roda no processo filho: carrega o modelo e atende pedidos até o pipe fechar."""
+    from modelo import GerenciadorModelo
+    modelo = GerenciadorModelo.instancia(nome)
+    try:
+        modelo.aguardar()
+    except Exception as e:
+        conexao.send(("erro", str(e)))
+        return
+    conexao.send(("pronto", None))
+
+    memoria = None
+    while True:
+        try:
+            pedido = conexao.recv()
+        except (EOFError, OSError):
+            break
+        if pedido[0] == "ping":
+            conexao.send(("pong", None))
+            continue
+        if pedido[0] == "sair":
+            break
+        _, nome_memoria, formas = pedido
+        if memoria is None or memoria.name != nome_memoria:
+            if memoria is not None:
+                memoria.close()
+            memoria = _anexar_memoria(nome_memoria)
+        try:
+            recortes = [np.ndarray(forma, dtype=np.uint8, buffer=memoria.buf, offset=offset)
+                        for offset, forma in formas]
+            vetores = modelo.embed(recortes)
+            del recortes
+            # Os recortes já foram usados: a resposta vai no mesmo bloco
+            if vetores.nbytes <= memoria.size:
+                np.ndarray(vetores.shape, dtype=np.float32, buffer=memoria.buf)[:] = vetores
+                conexao.send(("ok", vetores.shape))
+            else:
+                conexao.send(("dados", vetores))
+        except Exception as e:
+            conexao.send(("erro", str(e)))
+    if memoria is not None:
+        memoria.close()
+
+
+class _Worker:
+    """Lado do processo principal de um worker: processo, pipe e memória compartilhada."""
+
+    def __init__(self, nome, indice, contexto):
+        self.indice = indice
+        self.conexao, conexao_filho = contexto.Pipe()
+        self.memoria = shared_memory.SharedMemory(create=True, size=CAPACIDADE_INICIAL)
+        self.processo = contexto.Process(target=_principal_worker, args=(nome, conexao_filho),
+                                         name=f"modelo-{indice}", daemon=True)
+        with _sem_main_do_programa():
+            self.processo.start()
+        conexao_filho.close()
+
+    def aguardar_carga(self):
+        """Bloqueia até o worker carregar o modelo; devolve None ou a mensagem de erro."""
+        try:
+            tipo, erro = self.conexao.recv()
+        except (EOFError, OSError):
+            self.processo.join(1.0)
+            return f"processo do modelo terminou ao carregar (código {self.processo.exitcode})"
+        return None if tipo == "pronto" else erro
+
+    def _garantir_capacidade(self, tamanho):
+        if tamanho <= self.memoria.size:
+            return
+        capacidade = self.memoria.size
+        while capacidade < tamanho:
+            capacidade *= 2
+        self.memoria.close()
+        self.memoria.unlink()
+        self.memoria = shared_memory.SharedMemory(create=True, size=capacidade)
+
+    def _responder(self, timeout):
+        if not self.conexao.poll(timeout):
+            raise TimeoutError(f"sem resposta em {timeout}s")
+        return self.conexao.recv()
+
+    def embed(self, lote, timeout):
+        recortes = [np.ascontiguousarray(r, dtype=np.uint8) for r in lote]
+        self._garantir_capacidade(sum(r.nbytes for r in recortes))
+        formas, offset = [], 0
+        for recorte in recortes:
+            np.ndarray(recorte.shape, dtype=np.uint8, buffer=self.memoria.buf, offset=offset)[:] = recorte
+            formas.append((offset, recorte.shape))
+            offset += recorte.nbytes
+        self.conexao.send(("embed", self.memoria.name, formas))
+        tipo, conteudo = self._responder(timeout)
+        if tipo == "erro":
+            raise ValueError(conteudo)
+        if tipo == "dados":
+            return conteudo
+        return np.ndarray(conteudo, dtype=np.float32, buffer=self.memoria.buf).copy()
+
+    def saudavel(self, timeout):
+        if not self.processo.is_alive():
+            return False
+        try:
+            self.conexao.send(("ping",))
+            return self._responder(timeout)[0] == "pong"
+        except (EOFError, OSError, TimeoutError):
+            return False
+
+    def encerrar(self, timeout=2.0):
+        try:
+            self.conexao.send(("sair",))
+        except (EOFError, OSError):
+            pass
+        self.processo.join(timeout)
+        if self.processo.is_alive():
+            self.processo.kill()
+            self.processo.join(timeout)
+        self.conexao.close()
+        self.memoria.close()
+        self.memoria.unlink()
+
+
+class GerenciadorModeloProcessos:
+    _instancias = {}
+    _lock_instancias = threading.Lock()
+
+    @classmethod
+    def instancia(cls, nome="VGG-Face", n_processos=1):
+        with cls._lock_instancias:
+            if nome not in cls._instancias:
+                cls._instancias[nome] = cls(nome, n_processos)
+            return cls._instancias[nome]
+
+    def __init__(self, nome, n_processos=1, timeout=30.0, intervalo_saude=5.0):
+        self.nome = nome
+        self.n_processos = n_processos
+        self.timeout = timeout
+        self.intervalo_saude = intervalo_saude
+        # spawn: o filho não herda threads nem o estado do Qt/OpenCV do processo principal
+        self._contexto = multiprocessing.get_context("spawn")
+        self._workers = []
+        self._livres = Queue()
+        self._lock = threading.Lock()
+        self._pronto = threading.Event()
+        self._erro = None
+        self._falhas_carga = 0
+        self._iniciado = False
+        self._parar = threading.Event()
+        self.reinicios = 0
+
+    def carregar_em_segundo_plano(self, ao_terminar=None):
+        """Sobe os workers; ``ao_terminar(ok, erro)`` é chamado quando o primeiro ficar pronto."""
+        with self._lock:
+            if self._iniciado:
+                return
+            self._iniciado = True
+            self._ao_terminar = ao_terminar
+            for i in range(self.n_processos):
+                self._iniciar_worker(i)
+        threading.Thread(target=self._vigiar, name="vigia-modelo", daemon=True).start()
+        atexit.register(self.encerrar)
+
+    def carregar(self):
+        self.carregar_em_segundo_plano()
+        self._pronto.wait()
+
+    def _iniciar_worker(self, indice):
+        worker = _Worker(self.nome, indice, self._contexto)
+        self._workers.append(worker)
+        threading.Thread(target=self._esperar_carga, args=(worker,), name=f"carga-modelo-{indice}",
+                         daemon=True).start()
+
+    def _esperar_carga(self, worker):
+        erro = worker.aguardar_carga()
+        if erro is not None:
+            print(f"Erro ao carregar o modelo {self.nome} (processo {worker.indice}): {erro}")
+            worker.encerrar(timeout=0.5)
+        with self._lock:
+            if erro is None:
+                self._livres.put(worker)
+            else:
+                self._workers.remove(worker)
+                self._falhas_carga += 1
+                # Só é erro do modelo se nenhum worker conseguiu carregar
+                if self._falhas_carga < self.n_processos or self._pronto.is_set():
+                    return
+                self._erro = erro
+            if self._pronto.is_set():
+                return
+            self._pronto.set()
+        if self._ao_terminar:
+            self._ao_terminar(self._erro is None, str(self._erro or ""))
+
+    def _reiniciar(self, worker, motivo):
+        print(f"Processo do modelo {worker.indice} reiniciado: {motivo}")
+        METRICAS.contar("reinicios_modelo")
+        with self._lock:
+            self.reinicios += 1
+            self._workers.remove(worker)
+            if not self._parar.is_set():
+                self._iniciar_worker(worker.indice)
+        worker.encerrar(timeout=0.5)
+
+    def _vigiar(self):
+        while not self._parar.wait(self.intervalo_saude):
+            # Só pinga quem está livre; quem está ocupado responde pelo timeout do embed
+            for _ in range(self._livres.qsize()):
+                try:
+                    worker = self._livres.get_nowait()
+                except Empty:
+                    break
+                if worker.saudavel(self.timeout):
+                    self._livres.put(worker)
+                else:
+                    self._reiniciar(worker, "não respondeu ao ping")
+
+    def pronto(self):
+        return self._pronto.is_set() and self._erro is None
+
+    def aguardar(self, timeout=None):
+        """Espera o primeiro worker carregar (subindo os workers se ninguém subiu)."""
+        if not self._iniciado:
+            self.carregar_em_segundo_plano()
+        if not self._pronto.wait(timeout):
+            return False
+        if self._erro is not None:
+            raise RuntimeError(f"Modelo {self.nome} indisponível: {self._erro}")
+        return True
+
+    def embed(self, lote):
+        """Embeddings (float32, uma linha por rosto) de um lote de recortes BGR."""
+        if not len(lote):
+            return np.zeros((0, 0), dtype=np.float32)
+        self.aguardar()
+        try:
+            worker = self._livres.get(timeout=self.timeout)
+        except Empty:
+            raise RuntimeError(f"Nenhum processo do modelo {self.nome} disponível") from None
+        with METRICAS.medir("embedding"):
+            try:
+                vetores = worker.embed(lote, self.timeout)
+            except ValueError:
+                self._livres.put(worker)
+                raise
+            except (EOFError, OSError, TimeoutError) as e:
+                self._reiniciar(worker, str(e) or type(e).__name__)
+                raise RuntimeError(f"Processo do modelo falhou no lote: {e}") from e
+        self._livres.put(worker)
+        return vetores
+
+    def encerrar(self):
+        self._parar.set()
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.encerrar()
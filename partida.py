@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# ============================
+# Tempo de partida do app
+# ============================
+#
+# front.py importa este módulo antes de tudo, então os tempos contam daqui.
+# Durante a abertura cada etapa é registrada em PARTIDA:
+#   PARTIDA.marcar("janela")                      -> marco (ms desde o início)
+#   with PARTIDA.etapa("import deepface"): ...    -> etapa com duração
+# e o front imprime o resumo quando o reconhecimento fica pronto.
+#
+# Relatório para acompanhar regressões (cada import num interpretador novo,
+# e o app inteiro com ``front.py --medir-partida``, sem tela se não houver):
+#   python partida.py --saida partida.json
+#   python partida.py --comparar partida.json --tolerancia 20
+
+MODULOS = ["numpy", "cv2", "PyQt6.QtWidgets", "deepface", "servico", "front"]
+
+
+class RelatorioPartida:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self._lock = threading.Lock()
+        self.etapas = []
+
+    def _agora_ms(self):
+        return round((time.perf_counter() - self.inicio) * 1000, 1)
+
+    def marcar(self, nome):
+        with self._lock:
+            self.etapas.append({"etapa": nome, "ms": self._agora_ms()})
+
+    @contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.etapas.append({"etapa": nome, "ms": self._agora_ms(),
+                                    "duracao_ms": round((time.perf_counter() - inicio) * 1000, 1)})
+
+    def resumo(self):
+        with self._lock:
+            return {"etapas": list(self.etapas)}
+
+    def linha(self):
+        """Resumo curto: cada etapa com o momento em que terminou (e a duração)."""
+        partes = []
+        for e in self.resumo()["etapas"]:
+            duracao = f" ({e['duracao_ms']:.0f} ms)" if "duracao_ms" in e else ""
+            partes.append(f"{e['etapa']} {e['ms']:.0f} ms{duracao}")
+        return ", ".join(partes)
+
+
+# Instância única do processo
+PARTIDA = RelatorioPartida()
+
+
+# ============================
+# Relatório (linha de comando)
+# ============================
+
+def tempo_import(modulo, pasta):
+    """ms para importar ``modulo`` num interpretador novo; None se o import falhar."""
+    import subprocess
+    codigo = ("import time; t = time.perf_counter(); import {0}; "
+              "print((time.perf_counter() - t) * 1000)").format(modulo)
+    resultado = subprocess.run([sys.executable, "-c", codigo], cwd=pasta, capture_output=True, text=True)
+    if resultado.returncode != 0:
+        return None
+    return float(resultado.stdout.strip().splitlines()[-1])
+
+
+def partida_app(pasta, timeout=300.0):
+    """Abre o front.py até o reconhecimento ficar pronto; devolve o resumo de PARTIDA."""
+    import subprocess
+    env = dict(os.environ)
+    if not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY") and sys.platform.startswith("linux"):
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    inicio = time.perf_counter()
+    resultado = subprocess.run([sys.executable, "front.py", "--medir-partida"], cwd=pasta, env=env,
+                               capture_output=True, text=True, timeout=timeout)
+    processo_ms = round((time.perf_counter() - inicio) * 1000, 1)
+    for linha in reversed(resultado.stdout.splitlines()):
+        try:
+            resumo = json.loads(linha)
+        except ValueError:
+            continue
+        if isinstance(resumo, dict) and "etapas" in resumo:
+            # Inclui a subida do interpretador, que as etapas não veem
+            return dict(resumo, processo_ms=processo_ms)
+    raise RuntimeError(f"front.py não gerou o relatório de partida:\n{resultado.stderr[-2000:]}")
+
+
+def _mediana(valores):
+    valores = sorted(valores)
+    return valores[len(valores) // 2]
+
+
+def comparar(anterior, atual):
+    """Variação (%) de cada import e de cada etapa do app em relação a um relatório anterior."""
+    def tempos(relatorio):
+        valores = {f"import {m}": ms for m, ms in relatorio.get("imports", {}).items() if ms is not None}
+        app = relatorio.get("app") or {}
+        valores.update({e["etapa"]: e["ms"] for e in app.get("etapas", [])})
+        if "processo_ms" in app:
+            valores["processo"] = app["processo_ms"]
+        return valores
+
+    antigos, novos = tempos(anterior), tempos(atual)
+    return [
+        {"item": item, "ms": [antigos[item], ms],
+         "variacao_pct": round(100 * (ms / max(antigos[item], 1e-9) - 1), 1)}
+        for item, ms in novos.items() if item in antigos
+    ]
+
+
+def main(argv=None):
+    # argparse/subprocess só na linha de comando: o front.py importa este módulo antes de tudo
+    import argparse
+    parser = argparse.ArgumentParser(description="Tempo de import dos módulos e de partida do app.")
+    parser.add_argument("--modulos", nargs="+", default=MODULOS)
+    parser.add_argument("--repeticoes", type=int, default=3, help="imports medidos N vezes (mediana)")
+    parser.add_argument("--sem-app", action="store_true", help="não abre o front.py")
+    parser.add_argument("--saida", help="grava o relatório em JSON")
+    parser.add_argument("--comparar", help="relatório anterior (JSON) para comparar")
+    parser.add_argument("--tolerancia", type=float, help="com --comparar: sai com erro se algo piorar mais que N%%")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args(argv)
+    pasta = os.path.dirname(os.path.abspath(__file__))
+
+    imports = {}
+    for modulo in args.modulos:
+        tempos = [tempo_import(modulo, pasta) for _ in range(args.repeticoes)]
+        imports[modulo] = None if None in tempos else round(_mediana(tempos), 1)
+    relatorio = {"python": sys.version.split()[0], "imports": imports, "app": None}
+    if not args.sem_app:
+        relatorio["app"] = partida_app(pasta)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    variacoes = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            variacoes = comparar(json.load(f), relatorio)
+        relatorio["comparacao"] = variacoes
+
+    if args.json:
+        json.dump(relatorio, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print(f"{'import':<28} {'ms':>9}")
+        for modulo, ms in imports.items():
+            print(f"{modulo:<28} {'falhou' if ms is None else f'{ms:.1f}':>9}")
+        if relatorio["app"]:
+            print(f"\n{'app (front.py)':<28} {'ms':>9} {'duração':>9}")
+            for e in relatorio["app"]["etapas"]:
+                duracao = f"{e['duracao_ms']:.1f}" if "duracao_ms" in e else "-"
+                print(f"{e['etapa']:<28} {e['ms']:>9.1f} {duracao:>9}")
+            print(f"{'processo inteiro':<28} {relatorio['app']['processo_ms']:>9.1f}")
+        if variacoes:
+            print(f"\n{'comparação':<28} {'antes':>9} {'agora':>9} {'var.':>8}")
+            for v in variacoes:
+                print(f"{v['item']:<28} {v['ms'][0]:>9.1f} {v['ms'][1]:>9.1f} {v['variacao_pct']:>+7.1f}%")
+
+    if variacoes and args.tolerancia is not None:
+        piores = [v for v in variacoes if v["variacao_pct"] > args.tolerancia]
+        for v in piores:
+            print(f"Regressão: {v['item']} {v['variacao_pct']:+.1f}%", file=sys.stderr)
+        return 1 if piores else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import math
+import threading
+import cv2
+
+# ============================
+# Pipeline detectar -> alinhar -> embedding
+# ============================
+#
+# Usado tanto no cadastro/galeria quanto no login, para que os embeddings dos
+# dois lados venham de recortes feitos do mesmo jeito. A detecção é a Haar do
+# OpenCV (a mesma do preview): quem já detectou o rosto no frame passa a caixa
+# para recortar() e não há uma segunda detecção dentro do DeepFace.
+
+
+class PipelineRosto:
+    def __init__(self, modelo, margem=0.15, alinhar=True):
+        self.modelo = modelo
+        self.margem = margem
+        self.alinhar = alinhar
+        self._detector = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        self._detector_olhos = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_eye.xml")
+        # CascadeClassifier não é seguro para uso simultâneo em várias threads
+        self._lock_rosto = threading.Lock()
+        self._lock_olhos = threading.Lock()
+
+    def detectar(self, frame, cinza=None):
+        """Rostos (x, y, w, h) do frame, do maior para o menor."""
+        if cinza is None:
+            cinza = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return self.detectar_cinza(cinza)
+
+    def detectar_cinza(self, cinza, tamanho_min=None, tamanho_max=None):
+        tamanho_min = (tamanho_min, tamanho_min) if tamanho_min else None
+        tamanho_max = (tamanho_max, tamanho_max) if tamanho_max else None
+        with self._lock_rosto:
+            faces = self._detector.detectMultiScale(cinza, 1.1, 5, minSize=tamanho_min, maxSize=tamanho_max)
+        faces = [tuple(int(v) for v in face) for face in faces]
+        return sorted(faces, key=lambda f: f[2] * f[3], reverse=True)
+
+    def _angulo_olhos(self, cinza_rosto):
+        # Procura os olhos só na metade de cima do rosto
+        metade = cinza_rosto[:int(cinza_rosto.shape[0] * 0.6)]
+        with self._lock_olhos:
+            olhos = self._detector_olhos.detectMultiScale(metade, 1.1, 5)
+        if len(olhos) < 2:
+            return 0.0
+        olhos = sorted(olhos, key=lambda o: o[2] * o[3], reverse=True)[:2]
+        (x1, y1), (x2, y2) = sorted((x + w / 2, y + h / 2) for x, y, w, h in olhos)
+        angulo = math.degrees(math.atan2(y2 - y1, x2 - x1))
+        # Ângulos grandes quase sempre são detecções erradas (sobrancelha, narina...)
+        return angulo if abs(angulo) <= 30 else 0.0
+
+    def recortar(self, frame, face):
+        """Recorte do rosto com margem, girado para deixar os olhos na horizontal."""
+        x, y, w, h = face
+        altura, largura = frame.shape[:2]
+        m = int(self.margem * max(w, h))
+        x0, y0 = max(0, x - m), max(0, y - m)
+        x1, y1 = min(largura, x + w + m), min(altura, y + h + m)
+        recorte = frame[y0:y1, x0:x1]
+        if self.alinhar:
+            angulo = self._angulo_olhos(cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY))
+            if angulo:
+                centro = (x + w / 2 - x0, y + h / 2 - y0)
+                rotacao = cv2.getRotationMatrix2D(centro, angulo, 1.0)
+                recorte = cv2.warpAffine(recorte, rotacao, (recorte.shape[1], recorte.shape[0]),
+                                         borderMode=cv2.BORDER_REPLICATE)
+        return recorte
+
+    def recortar_imagem(self, imagem, exigir_rosto=False):
+        """Detecta o maior rosto da imagem (BGR ou caminho) e devolve o recorte.
+
+        Sem rosto: levanta ValueError se ``exigir_rosto``, senão usa a imagem inteira.
+        """
+        if isinstance(imagem, str):
+            caminho, imagem = imagem, cv2.imread(imagem)
+            if imagem is None:
+                raise ValueError(f"Imagem não pôde ser lida: {caminho}")
+        faces = self.detectar(imagem)
+        if not faces:
+            if exigir_rosto:
+                raise ValueError("Nenhum rosto encontrado")
+            return imagem
+        return self.recortar(imagem, faces[0])
+
+    def embed_recortes(self, recortes):
+        return self.modelo.embed(recortes)
+
+    def embed_imagens(self, imagens, exigir_rosto=False):
+        """Embeddings de imagens inteiras (ex.: fotos da galeria), uma linha por imagem."""
+        return self.modelo.embed([self.recortar_imagem(imagem, exigir_rosto) for imagem in imagens])
@@ -0,0 +1,216 @@
+import sys
+import json
+import time
+import argparse
+import threading
+
+from config import (
+    PORTAS, LOTE_PORTAS, PAUSA_PORTA, THRESHOLD, SECURITY_KEY, CAMERA_OCIOSA, DETECCAO_ESCALA,
+    DETECCAO_PASSO, JANELA_QUALIDADE, SERVIDOR_RECONHECIMENTO, METRICAS_INTERVALO_LOG, METRICAS_PORTA
+)
+from captura import CapturaThread
+from executor import ExecutorLotes
+from pipeline import PipelineRosto
+from deteccao import DetectorRastreado
+from qualidade import AvaliadorQualidade, JanelaMelhorFrame
+from decisao import DecisorTemporal
+from metricas import METRICAS, LogMetricas, servir_metricas
+
+# ============================
+# Várias portas num processo só
+# ============================
+#
+# Uso:
+#   python portas.py                                   (PORTAS do config.py)
+#   python portas.py entrada=0 garagem=rtsp://10.0.0.5/stream deposito=simulado:teste.mp4
+#
+# Cada porta tem o próprio estado (captura, detector rastreado, filtro de
+# qualidade, janela do melhor frame e decisor temporal), como um login do
+# front.py que nunca termina. O modelo e a galeria são um só: os rostos de
+# todas as portas entram no mesmo ExecutorLotes, que revezando entre as portas
+# junta até LOTE_PORTAS rostos numa inferência (servico.identificar_lote).
+#
+# Depois de liberar ou negar alguém a porta fica PAUSA_PORTA segundos sem
+# mandar rostos. Cada decisão sai como uma linha JSON no stdout:
+#   {"porta", "decisao": "aceito"/"negado", "nome", "nivel", "momento"}
+
+
+class Porta:
+    def __init__(self, nome, origem, executor, limiar=THRESHOLD, ao_decidir=None, pausa=PAUSA_PORTA,
+                 ociosa=CAMERA_OCIOSA):
+        self.nome = nome
+        self.origem = origem
+        self.executor = executor
+        self.ao_decidir = ao_decidir
+        self.pausa = pausa
+        # Detector próprio: o CascadeClassifier de uma porta não espera pelo de outra
+        self.detector = DetectorRastreado(PipelineRosto(None), DETECCAO_ESCALA, DETECCAO_PASSO)
+        self.avaliador = AvaliadorQualidade()
+        self.janela = JanelaMelhorFrame(JANELA_QUALIDADE)
+        self.decisor = DecisorTemporal(limiar)
+        self.captura = CapturaThread(origem, processar=self._analisar, ociosa=ociosa)
+        self._lock = threading.Lock()
+        # Resultados de antes da última decisão não contam para a próxima
+        self.sessao = 0
+        self.pausada_ate = 0.0
+        self.enviados = 0
+        self.aceitos = 0
+        self.negados = 0
+
+    def iniciar(self):
+        if not self.captura.aberta():
+            return False
+        self.captura.start()
+        return True
+
+    def _analisar(self, frame):
+        # Roda na thread de captura da porta
+        agora = time.monotonic()
+        if agora < self.pausada_ate:
+            self.janela.limpar()
+            return None
+        faces = self.detector.detectar(frame)
+        if not faces:
+            return None
+        pontuacao, motivo = self.avaliador.avaliar(frame, faces[0])
+        if motivo:
+            METRICAS.contar(f"rejeitados_{motivo}")
+            return None
+        melhor = self.janela.oferecer(pontuacao, (frame, faces[0]), agora)
+        # Um pedido por porta de cada vez: o próximo sai com um rosto mais novo
+        if melhor is not None and not self.executor.pendentes(self.nome):
+            sessao = self.sessao
+            if self.executor.submeter(self.nome, melhor, lambda resultado: self._receber(sessao, resultado)):
+                self.enviados += 1
+                METRICAS.contar("rostos_enviados")
+        return None
+
+    def _receber(self, sessao, resultado):
+        # Roda no worker do executor
+        with self._lock:
+            if sessao != self.sessao:
+                return
+            decisao = self.decisor.adicionar((resultado["nome"], resultado["Nível"]), resultado["distancia"])
+            if decisao is None:
+                return
+            usuario = self.decisor.usuario if decisao == "aceito" else None
+            self.decisor.reiniciar()
+            self.sessao += 1
+            self.pausada_ate = time.monotonic() + self.pausa
+            if decisao == "aceito":
+                self.aceitos += 1
+            else:
+                self.negados += 1
+        METRICAS.contar("logins_aceitos" if decisao == "aceito" else "logins_negados")
+        if self.ao_decidir:
+            self.ao_decidir(self, decisao, usuario)
+
+    def parar(self):
+        self.captura.parar()
+
+    def estatisticas(self):
+        return dict(self.captura.estatisticas(), enviados=self.enviados, aceitos=self.aceitos,
+                    negados=self.negados, deteccao=self.detector.estatisticas(),
+                    rejeitados=dict(self.avaliador.rejeicoes))
+
+
+def imprimir_decisao(porta, decisao, usuario):
+    nome, nivel = usuario or (None, None)
+    print(json.dumps({"porta": porta.nome, "decisao": decisao, "nome": nome, "nivel": nivel,
+                      "momento": time.strftime("%Y-%m-%dT%H:%M:%S")}, ensure_ascii=False), flush=True)
+
+
+class CentralPortas:
+    """Sobe uma Porta por origem, todas identificando pelo mesmo serviço em lotes."""
+
+    def __init__(self, servico, origens, lote_max=LOTE_PORTAS, ao_decidir=imprimir_decisao, pausa=PAUSA_PORTA):
+        self.servico = servico
+        self.executor = ExecutorLotes(self._identificar, lote_max=lote_max)
+        self.portas = {
+            nome: Porta(nome, origem, self.executor, ao_decidir=ao_decidir, pausa=pausa)
+            for nome, origem in origens.items()
+        }
+
+    def _identificar(self, itens):
+        with METRICAS.medir("identificacao"):
+            return self.servico.identificar_lote([frame for frame, _ in itens], [face for _, face in itens])
+
+    def iniciar(self):
+        """Inicia as portas; devolve os nomes das que não abriram a câmera."""
+        return [nome for nome, porta in self.portas.items() if not porta.iniciar()]
+
+    def parar(self):
+        for porta in self.portas.values():
+            porta.parar()
+        self.executor.encerrar()
+
+    def estatisticas(self):
+        lotes = self.executor.lotes
+        return {
+            "portas": {nome: porta.estatisticas() for nome, porta in self.portas.items()},
+            "lotes": lotes,
+            "rostos_por_lote": round(self.executor.itens / lotes, 2) if lotes else 0.0,
+            "descartados": self.executor.descartados,
+        }
+
+
+def ler_origens(textos):
+    origens = {}
+    for texto in textos:
+        nome, separador, origem = texto.partition("=")
+        if not separador or not nome or not origem:
+            raise ValueError(f"Porta inválida (use nome=origem): {texto}")
+        origens[nome] = origem
+    return origens
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconhecimento em várias portas com um modelo só.")
+    parser.add_argument("portas", nargs="*", help="nome=origem (câmera, vídeo, pasta, rtsp://...); padrão: PORTAS")
+    parser.add_argument("--lote", type=int, default=LOTE_PORTAS, help="máximo de rostos por inferência")
+    parser.add_argument("--pausa", type=float, default=PAUSA_PORTA, help="segundos de pausa após cada decisão")
+    args = parser.parse_args(argv)
+    try:
+        origens = ler_origens(args.portas) if args.portas else dict(PORTAS)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if SERVIDOR_RECONHECIMENTO:
+        from cliente import ClienteReconhecimento
+        servico = ClienteReconhecimento(SERVIDOR_RECONHECIMENTO, SECURITY_KEY)
+    else:
+        from servico import ServicoReconhecimento
+        servico = ServicoReconhecimento()
+    servico.carregar_em_segundo_plano()
+
+    log_metricas = LogMetricas(intervalo=METRICAS_INTERVALO_LOG) if METRICAS_INTERVALO_LOG else None
+    if log_metricas:
+        log_metricas.start()
+    servidor_metricas = servir_metricas(METRICAS_PORTA) if METRICAS_PORTA else None
+
+    central = CentralPortas(servico, origens, args.lote, pausa=args.pausa)
+    falharam = central.iniciar()
+    for nome in falharam:
+        print(f"Não foi possível abrir a câmera da porta {nome} ({origens[nome]})", file=sys.stderr)
+    if len(falharam) == len(origens):
+        central.parar()
+        return 1
+    print(f"{len(origens) - len(falharam)} porta(s) ativas, {servico.total_usuarios()} usuários na galeria",
+          file=sys.stderr)
+    try:
+        while any(porta.captura.is_alive() for porta in central.portas.values()):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        central.parar()
+        if log_metricas:
+            log_metricas.parar()
+        if servidor_metricas:
+            servidor_metricas.shutdown()
+        print(json.dumps(central.estatisticas(), ensure_ascii=False), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
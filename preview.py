@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+from PyQt6.QtGui import QImage, QPixmap
+
+from metricas import METRICAS
+
+# ============================
+# Desenho do preview da câmera
+# ============================
+#
+# O frame BGR do OpenCV vai direto para um QImage Format_BGR888 (sem
+# cvtColor), redimensionado uma única vez para o tamanho do QLabel dentro de
+# um buffer reaproveitado. O QPixmap também é reaproveitado entre frames, e
+# nada é feito enquanto o preview não está visível. Em METRICAS, cada frame
+# desenhado é um tempo "render" e cada um pulado conta em preview_pulados.
+
+
+class RenderizadorPreview:
+    def __init__(self, label):
+        self.label = label
+        self._buffer = None
+        self._pixmap = QPixmap()
+        self.desenhados = 0
+        self.pulados = 0
+
+    def _tamanho_alvo(self, largura, altura):
+        area = self.label.contentsRect()
+        fator = min(area.width() / largura, area.height() / altura)
+        if fator <= 0:
+            return largura, altura
+        return max(1, int(largura * fator)), max(1, int(altura * fator))
+
+    def desenhar(self, frame):
+        """Mostra o frame no label; devolve False se pulou (label oculto/minimizado)."""
+        if not self.label.isVisible() or self.label.window().isMinimized():
+            self.pulados += 1
+            METRICAS.contar("preview_pulados")
+            return False
+        with METRICAS.medir("render"):
+            self._desenhar(frame)
+        self.desenhados += 1
+        return True
+
+    def _desenhar(self, frame):
+        altura, largura = frame.shape[:2]
+        alvo_w, alvo_h = self._tamanho_alvo(largura, altura)
+        if (alvo_w, alvo_h) == (largura, altura) and frame.flags["C_CONTIGUOUS"]:
+            imagem = frame
+        else:
+            if self._buffer is None or self._buffer.shape[:2] != (alvo_h, alvo_w):
+                self._buffer = np.empty((alvo_h, alvo_w, 3), dtype=np.uint8)
+            interpolacao = cv2.INTER_AREA if alvo_w < largura else cv2.INTER_LINEAR
+            cv2.resize(frame, (alvo_w, alvo_h), dst=self._buffer, interpolation=interpolacao)
+            imagem = self._buffer
+        qt_img = QImage(imagem.data, alvo_w, alvo_h, imagem.strides[0], QImage.Format.Format_BGR888)
+        # convertFromImage reaproveita o QPixmap em vez de criar um novo a cada frame
+        self._pixmap.convertFromImage(qt_img)
+        self.label.setPixmap(self._pixmap)
@@ -0,0 +1,125 @@
+import cv2
+import numpy as np
+
+# ============================
+# Qualidade das amostras de rosto
+# ============================
+#
+# Filtros baratos (alguns décimos de ms por rosto) para não gastar uma
+# inferência do VGG-Face com rostos borrados, pequenos, escuros ou de perfil.
+
+
+def nitidez(cinza):
+    """Variância do Laplaciano: quanto maior, menos borrada a imagem."""
+    return float(cv2.Laplacian(cinza, cv2.CV_64F).var())
+
+
+def brilho(cinza):
+    return float(cinza.mean())
+
+
+def frontalidade(cinza, lado=64):
+    """Simetria entre as metades esquerda e direita do rosto (1 = simétrico, de frente)."""
+    rosto = cv2.equalizeHist(cv2.resize(cinza, (lado, lado), interpolation=cv2.INTER_AREA)).astype(np.float32)
+    esquerda = rosto[:, :lado // 2]
+    direita = np.fliplr(rosto[:, lado - lado // 2:])
+    return float(np.clip(1.0 - np.mean(np.abs(esquerda - direita)) / 128.0, 0.0, 1.0))
+
+
+def miniatura(cinza, lado=32):
+    """Rosto reduzido e padronizado (média 0, desvio 1) para comparar poses."""
+    mini = cv2.resize(cinza, (lado, lado), interpolation=cv2.INTER_AREA).astype(np.float32)
+    return (mini - mini.mean()) / (mini.std() + 1e-6)
+
+
+class AvaliadorQualidade:
+    def __init__(self, nitidez_min=60.0, tamanho_min=80, brilho_min=50.0, brilho_max=210.0, frontal_min=0.6):
+        self.nitidez_min = nitidez_min
+        self.tamanho_min = tamanho_min
+        self.brilho_min = brilho_min
+        self.brilho_max = brilho_max
+        self.frontal_min = frontal_min
+        self.rejeicoes = {}
+
+    def avaliar(self, frame, face):
+        """Devolve (pontuação, motivo); motivo é None quando o rosto foi aprovado.
+
+        A pontuação (maior = melhor) serve para escolher o melhor entre vários frames.
+        """
+        x, y, w, h = face
+        motivo = None
+        if min(w, h) < self.tamanho_min:
+            motivo = "pequeno"
+        else:
+            cinza = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+            valor_brilho = brilho(cinza)
+            valor_nitidez = nitidez(cinza)
+            valor_frontal = frontalidade(cinza)
+            if not self.brilho_min <= valor_brilho <= self.brilho_max:
+                motivo = "iluminacao"
+            elif valor_nitidez < self.nitidez_min:
+                motivo = "borrado"
+            elif valor_frontal < self.frontal_min:
+                motivo = "perfil"
+        if motivo:
+            self.rejeicoes[motivo] = self.rejeicoes.get(motivo, 0) + 1
+            return 0.0, motivo
+        # Nitidez satura em 4x o mínimo para não dominar a pontuação
+        return min(valor_nitidez / (4 * self.nitidez_min), 1.0) + valor_frontal + min(w, h) / 400.0, None
+
+
+class JanelaMelhorFrame:
+    """Junta os rostos aprovados durante ``duracao`` segundos e entrega só o melhor."""
+
+    def __init__(self, duracao=0.5):
+        self.duracao = duracao
+        self._inicio = None
+        self._melhor = None
+
+    def oferecer(self, pontuacao, item, agora):
+        """Devolve o melhor item quando a janela fecha; senão None."""
+        if self._inicio is None:
+            self._inicio = agora
+        if self._melhor is None or pontuacao > self._melhor[0]:
+            self._melhor = (pontuacao, item)
+        if agora - self._inicio >= self.duracao:
+            melhor = self._melhor[1]
+            self.limpar()
+            return melhor
+        return None
+
+    def limpar(self):
+        self._inicio = None
+        self._melhor = None
+
+
+class SeletorAmostras:
+    """Escolhe N amostras boas e diferentes entre si (pose/expressão) para o cadastro."""
+
+    def __init__(self, n_amostras=5, diferenca_min=0.35, avaliador=None):
+        self.n_amostras = n_amostras
+        self.diferenca_min = diferenca_min
+        self.avaliador = avaliador or AvaliadorQualidade()
+        self.amostras = []
+        # Caixa do rosto de cada amostra: o cadastro recorta daqui, sem detectar de novo
+        self.faces = []
+        self._miniaturas = []
+
+    def completo(self):
+        return len(self.amostras) >= self.n_amostras
+
+    def oferecer(self, frame, face):
+        """Guarda o frame se o rosto ``face`` (x, y, w, h) for bom e diferente dos já aceitos."""
+        if self.completo():
+            return False
+        _, motivo = self.avaliador.avaliar(frame, face)
+        if motivo:
+            return False
+        x, y, w, h = face
+        mini = miniatura(cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY))
+        if any(float(np.mean(np.abs(mini - outra))) < self.diferenca_min for outra in self._miniaturas):
+            return False
+        self.amostras.append(frame.copy())
+        self.faces.append(tuple(int(v) for v in face))
+        self._miniaturas.append(mini)
+        return True
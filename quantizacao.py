@@ -0,0 +1,170 @@
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+# ============================
+# Armazenamento quantizado dos vetores da galeria
+# ============================
+#
+# Os índices (indice.py) guardam os vetores normalizados numa MatrizQuantizada:
+#   "float32" -> 4 bytes por dimensão (exato)
+#   "float16" -> 2 bytes por dimensão
+#   "int8"    -> 1 byte por dimensão + uma escala float32 por vetor
+#                (vetor ~= codigos * escala, escala = max|x| / 127)
+# Um VGG-Face (4096 dimensões) ocupa 16 KB, 8 KB ou ~4 KB.
+#
+# A busca trabalha direto nos códigos: blocos de ``bloco`` linhas são
+# convertidos para float32 só na hora do produto com as consultas (a matriz
+# inteira em float32 nunca existe na memória) e a escala de cada vetor é
+# aplicada no resultado. A consulta continua em float32.
+#
+# O impacto no reconhecimento sai do relatório deste módulo:
+#   python quantizacao.py --usuarios 10000
+#   python quantizacao.py --base cache_embeddings/vgg-face.npy
+
+PRECISOES = ("float32", "float16", "int8")
+
+
+class MatrizQuantizada:
+    def __init__(self, codigos, escalas=None, precisao="float32"):
+        self.codigos = codigos
+        self.escalas = escalas
+        self.precisao = precisao
+
+    @classmethod
+    def de(cls, vetores, precisao="float32"):
+        if precisao not in PRECISOES:
+            raise ValueError(f"Precisão desconhecida: {precisao}")
+        vetores = np.asarray(vetores, dtype=np.float32)
+        if precisao == "float32":
+            return cls(vetores, None, precisao)
+        if precisao == "float16":
+            return cls(vetores.astype(np.float16), None, precisao)
+        escalas = np.abs(vetores).max(axis=1) / 127.0 if len(vetores) else np.zeros(0, dtype=np.float32)
+        escalas = escalas.astype(np.float32)
+        escalas[escalas == 0] = 1.0
+        codigos = np.clip(np.rint(vetores / escalas[:, np.newaxis]), -127, 127).astype(np.int8)
+        return cls(codigos, escalas, precisao)
+
+    @classmethod
+    def vazia(cls, dim=0, precisao="float32"):
+        return cls.de(np.zeros((0, dim), dtype=np.float32), precisao)
+
+    def __len__(self):
+        return len(self.codigos)
+
+    @property
+    def nbytes(self):
+        return self.codigos.nbytes + (self.escalas.nbytes if self.escalas is not None else 0)
+
+    def linhas(self, selecao):
+        """Submatriz com as linhas indicadas (máscara ou índices)."""
+        escalas = self.escalas[selecao] if self.escalas is not None else None
+        return MatrizQuantizada(self.codigos[selecao], escalas, self.precisao)
+
+    def juntar(self, outra):
+        if not len(self):
+            return outra
+        escalas = None
+        if self.escalas is not None:
+            escalas = np.concatenate([self.escalas, outra.escalas])
+        return MatrizQuantizada(np.vstack([self.codigos, outra.codigos]), escalas, self.precisao)
+
+    def reconstruir(self, selecao=slice(None)):
+        """Vetores float32 (aproximados) das linhas indicadas."""
+        vetores = self.codigos[selecao].astype(np.float32)
+        if self.escalas is not None:
+            vetores *= self.escalas[selecao][..., np.newaxis]
+        return vetores
+
+    def similaridades(self, consultas, bloco=256):
+        """Produto interno de cada consulta (float32) com cada linha: [n_consultas, len]."""
+        consultas = np.atleast_2d(np.asarray(consultas, dtype=np.float32))
+        if self.precisao == "float32":
+            return consultas @ self.codigos.T
+        sims = np.empty((len(consultas), len(self)), dtype=np.float32)
+        for i in range(0, len(self), bloco):
+            np.matmul(consultas, self.codigos[i:i + bloco].astype(np.float32).T, out=sims[:, i:i + bloco])
+        if self.escalas is not None:
+            sims *= self.escalas
+        return sims
+
+
+# ============================
+# Relatório de precisão x memória
+# ============================
+
+def relatorio_quantizacao(vetores, consultas, k=1, precisoes=PRECISOES):
+    """Compara cada precisão com a busca exata em float32: concordância do top-k,
+    erro na distância de cosseno, memória e latência por consulta."""
+    from indice import normalizar_linhas, _top_k
+    vetores = normalizar_linhas(vetores)
+    consultas = normalizar_linhas(consultas)
+    ids = np.arange(len(vetores))
+    exata = 1.0 - consultas @ vetores.T
+    _, verdade = _top_k(exata, ids, k)
+
+    linhas = []
+    for precisao in precisoes:
+        matriz = MatrizQuantizada.de(vetores, precisao)
+        tempos = []
+        dist = np.empty_like(exata)
+        for i, consulta in enumerate(consultas):
+            t = time.perf_counter()
+            dist[i] = 1.0 - matriz.similaridades(consulta)[0]
+            tempos.append(time.perf_counter() - t)
+        _, encontrados = _top_k(dist, ids, k)
+        acertos = sum(len(np.intersect1d(e, v)) for e, v in zip(encontrados, verdade))
+        erro = np.abs(dist - exata)
+        tempos = np.asarray(tempos) * 1000
+        linhas.append({
+            "precisao": precisao,
+            "recall": round(acertos / (len(consultas) * min(k, len(vetores))), 4),
+            "erro_dist_medio": float(f"{erro.mean():.2e}"),
+            "erro_dist_max": float(f"{erro.max():.2e}"),
+            "memoria_mb": round(matriz.nbytes / 2 ** 20, 2),
+            "bytes_por_vetor": round(matriz.nbytes / max(len(matriz), 1), 1),
+            "latencia_p50_ms": round(float(np.percentile(tempos, 50)), 3),
+            "latencia_p95_ms": round(float(np.percentile(tempos, 95)), 3),
+        })
+    return linhas
+
+
+def main(argv=None):
+    from indice import gerar_base_sintetica
+    parser = argparse.ArgumentParser(description="Impacto da quantização da galeria na busca.")
+    parser.add_argument("--base", help="matriz .npy de embeddings (ex: cache_embeddings/vgg-face.npy)")
+    parser.add_argument("--usuarios", type=int, default=10000, help="tamanho da galeria sintética")
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args(argv)
+
+    if args.base:
+        vetores = np.load(args.base).astype(np.float32)
+        rng = np.random.default_rng(0)
+        consultas = vetores[rng.integers(0, len(vetores), args.consultas)]
+        consultas = consultas + 0.5 * vetores.std() * rng.standard_normal(consultas.shape, dtype=np.float32)
+    else:
+        vetores, gerar_consultas = gerar_base_sintetica(args.usuarios, args.dim)
+        consultas = gerar_consultas(args.consultas)
+
+    linhas = relatorio_quantizacao(vetores, consultas, args.k)
+    if args.json:
+        json.dump(linhas, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{len(vetores)} vetores de dim {vetores.shape[1]}, {len(consultas)} consultas, k={args.k}")
+    print(f"{'precisão':<8} {'recall':>7} {'erro méd.':>10} {'erro máx.':>10} {'MB':>8} {'B/vetor':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8}")
+    for l in linhas:
+        print(f"{l['precisao']:<8} {l['recall']:>7.4f} {l['erro_dist_medio']:>10.2e} {l['erro_dist_max']:>10.2e} "
+              f"{l['memoria_mb']:>8.2f} {l['bytes_por_vetor']:>8.1f} {l['latencia_p50_ms']:>8.3f} "
+              f"{l['latencia_p95_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import os
+import itertools
+import threading
+import cv2
+
+from config import (
+    DB_PATH, CACHE_PATH, MODELO, TIPO_INDICE, THRESHOLD, AGREGACAO, PRECISAO_GALERIA, PROCESSOS_MODELO
+)
+from cache_embeddings import CacheEmbeddings, EXTENSOES_IMAGEM
+from catalogo import CatalogoUsuarios
+from galeria import Galeria
+from indice import criar_indice
+from pipeline import PipelineRosto
+from metricas import METRICAS
+from partida import PARTIDA
+from util import validar_usuario
+
+# ============================
+# Núcleo de reconhecimento (sem interface)
+# ============================
+#
+# Modelo, galeria e fotos dos usuários ficam aqui; a interface (front.py) e o
+# servidor HTTP (servidor.py) só chamam estes métodos. Com o servidor, vários
+# terminais compartilham o mesmo modelo carregado e a mesma galeria usando
+# cliente.ClienteReconhecimento, que tem a mesma interface desta classe.
+#
+# Criar o serviço é barato: modelo e galeria só são carregados em carregar()
+# (o front chama na sua thread de partida, com a janela já aberta) ou em
+# carregar_em_segundo_plano(). Quem precisa da galeria espera a carga terminar.
+#
+# Resultado de identificar(): {"nome", "Nível", "distancia", "reconhecido"},
+# com o usuário mais próximo da galeria ("Desconhecido" se não houver rosto
+# ou galeria vazia). Quem precisa de mais de um frame para decidir (login)
+# usa a distância; "reconhecido" é só a comparação com o limiar.
+
+DESCONHECIDO = {"nome": "Desconhecido", "Nível": "", "distancia": None, "reconhecido": False}
+
+
+def _do_usuario(caminho, pasta_usuario):
+    """O arquivo é do usuário? Dentro de usuarios/<nível>/<nome>/ ou a foto
+    única usuarios/<nível>/<nome>.<ext>."""
+    caminho = os.path.realpath(caminho)
+    pasta = os.path.realpath(pasta_usuario)
+    if os.path.dirname(caminho) == pasta:
+        return True
+    raiz, ext = os.path.splitext(caminho)
+    return raiz == pasta and ext.lower() in EXTENSOES_IMAGEM
+
+
+def apagar_fotos(caminhos, pasta_usuario):
+    """Apaga as fotos indicadas (só as que são do usuário) e a pasta dele, se ficou
+    vazia; devolve quantos arquivos saíram."""
+    apagados = 0
+    for caminho in caminhos:
+        if not _do_usuario(caminho, pasta_usuario):
+            print(f"Foto fora da pasta do usuário, mantida: {caminho}")
+            continue
+        if os.path.isfile(caminho):
+            os.remove(caminho)
+            apagados += 1
+    if os.path.isdir(pasta_usuario) and not os.listdir(pasta_usuario):
+        os.rmdir(pasta_usuario)
+    return apagados
+
+
+def caminhos_livres(pasta_usuario, extensao=".jpg"):
+    """<n><extensao> ainda não usados na pasta do usuário (1, 2, ...), sem sobrescrever nada."""
+    return (c for c in (os.path.join(pasta_usuario, f"{n}{extensao}") for n in itertools.count(1))
+            if not os.path.exists(c))
+
+
+def carregar_galeria(pipeline, db_path=DB_PATH, cache_path=CACHE_PATH, catalogo=None):
+    # Só gera embeddings para fotos novas ou alteradas; o resto vem do cache em disco
+    cache = CacheEmbeddings(db_path, cache_path, pipeline.modelo.nome, PRECISAO_GALERIA, catalogo)
+    galeria = Galeria(cache, pipeline.embed_imagens,
+                      lambda: criar_indice(TIPO_INDICE, precisao=PRECISAO_GALERIA), AGREGACAO)
+    galeria.carregar()
+    return galeria
+
+
+class ServicoReconhecimento:
+    def __init__(self, modelo=MODELO, limiar=THRESHOLD, db_path=DB_PATH, cache_path=CACHE_PATH):
+        self.limiar = limiar
+        self.db_path = db_path
+        self.cache_path = cache_path
+        # Quem é quem (nome, nível, fotos) vem do catálogo, sem percorrer as pastas
+        self.catalogo = CatalogoUsuarios(db_path)
+        if PROCESSOS_MODELO:
+            # DeepFace/TensorFlow em outro(s) processo(s), fora do GIL deste
+            from modelo_processos import GerenciadorModeloProcessos
+            self.modelo = GerenciadorModeloProcessos.instancia(modelo, PROCESSOS_MODELO)
+        else:
+            from modelo import GerenciadorModelo
+            self.modelo = GerenciadorModelo.instancia(modelo)
+        # Mesmo detector/recorte para a galeria e para o login
+        self.pipeline = PipelineRosto(self.modelo)
+        self.galeria = None
+        self._lock_carga = threading.Lock()
+        self._carregado = threading.Event()
+        self._erro = None
+
+    # ---- estado do modelo ----
+
+    def carregar(self, ao_progresso=None):
+        """Carrega modelo e galeria (só na primeira chamada); ``ao_progresso(texto)`` a cada etapa."""
+        with self._lock_carga:
+            if not self._carregado.is_set():
+                try:
+                    if ao_progresso:
+                        ao_progresso("Carregando modelo de reconhecimento...")
+                    with PARTIDA.etapa("modelo"):
+                        self.modelo.aguardar()
+                    if ao_progresso:
+                        ao_progresso("Carregando usuários cadastrados...")
+                    with PARTIDA.etapa("galeria"):
+                        self.galeria = carregar_galeria(self.pipeline, self.db_path, self.cache_path, self.catalogo)
+                except Exception as e:
+                    self._erro = e
+                self._carregado.set()
+        if self._erro is not None:
+            raise RuntimeError(f"Reconhecimento indisponível: {self._erro}")
+
+    def carregar_em_segundo_plano(self, ao_terminar=None, ao_progresso=None):
+        """Dispara carregar() numa thread; ``ao_terminar(ok, erro)`` é chamado no fim."""
+        def carregar():
+            try:
+                self.carregar(ao_progresso)
+            except RuntimeError:
+                pass  # o erro segue para ao_terminar (e aguardar() levanta de novo)
+            if ao_terminar:
+                ao_terminar(self.pronto(), str(self._erro or ""))
+        threading.Thread(target=carregar, name="carga-servico", daemon=True).start()
+
+    def pronto(self):
+        return self._carregado.is_set() and self._erro is None
+
+    def aguardar(self):
+        """Espera a carga terminar (carregando aqui mesmo se ninguém começou)."""
+        self.carregar()
+
+    # ---- consultas ----
+
+    def _resultado(self, melhores):
+        if not melhores:
+            return dict(DESCONHECIDO)
+        registro, dist = melhores[0]
+        return {"nome": registro["nome"], "Nível": registro["Nível"], "distancia": dist,
+                "reconhecido": dist < self.limiar}
+
+    def identificar_lote(self, imagens, faces=None):
+        """Um resultado por imagem (BGR ou caminho). ``faces`` traz a caixa (x, y, w, h)
+        já detectada de cada imagem; sem ela (ou com None) o maior rosto é detectado aqui."""
+        faces = faces or [None] * len(imagens)
+        recortes, posicoes = [], []
+        with METRICAS.medir("recorte"):
+            for i, (imagem, face) in enumerate(zip(imagens, faces)):
+                try:
+                    if face is None:
+                        recortes.append(self.pipeline.recortar_imagem(imagem, exigir_rosto=True))
+                    else:
+                        recortes.append(self.pipeline.recortar(imagem, tuple(int(v) for v in face)))
+                    posicoes.append(i)
+                except ValueError:
+                    continue
+        resultados = [dict(DESCONHECIDO) for _ in imagens]
+        if recortes:
+            embeddings = self.pipeline.embed_recortes(recortes)
+            self.aguardar()
+            with METRICAS.medir("busca"):
+                encontrados = self.galeria.comparador().buscar_lote(embeddings, 1)
+            for i, melhores in zip(posicoes, encontrados):
+                resultados[i] = self._resultado(melhores)
+        METRICAS.contar("identificacoes", len(imagens))
+        return resultados
+
+    def identificar(self, imagem, face=None):
+        return self.identificar_lote([imagem], [face])[0]
+
+    def usuarios(self, nivel=None, limite=None, deslocamento=0):
+        """Nomes cadastrados no nível ou pares (nome, nível) de todos, em ordem e paginados."""
+        return self.catalogo.usuarios(nivel, limite, deslocamento)
+
+    def contar_usuarios(self, nivel=None):
+        """Usuários cadastrados (no catálogo), no nível ou no total."""
+        return self.catalogo.contar(nivel)
+
+    def total_usuarios(self):
+        """Usuários na galeria (os que podem ser reconhecidos)."""
+        self.aguardar()
+        return self.galeria.comparador().usuarios()
+
+    # ---- alterações ----
+
+    def cadastrar(self, nome, nivel, amostras, faces=None):
+        """Grava as amostras (BGR) em usuarios/<nível>/<nome>/ e troca as fotos antigas
+        do usuário na galeria. Devolve os caminhos salvos.
+
+        ``faces`` traz a caixa (x, y, w, h) já detectada em cada amostra, como em
+        identificar_lote(); sem ela (ou com None) o maior rosto é detectado aqui."""
+        validar_usuario(nome, nivel)
+        if not amostras:
+            raise ValueError("Nenhuma amostra para cadastrar")
+        self.aguardar()
+        faces = faces or [None] * len(amostras)
+        recortes = [
+            self.pipeline.recortar_imagem(amostra, exigir_rosto=True) if face is None
+            else self.pipeline.recortar(amostra, tuple(int(v) for v in face))
+            for amostra, face in zip(amostras, faces)
+        ]
+        vetores = self.pipeline.embed_recortes(recortes)
+        pasta_usuario = os.path.join(self.db_path, nivel, nome)
+        os.makedirs(pasta_usuario, exist_ok=True)
+        antigas = self.catalogo.fotos(nome, nivel)
+        # As amostras novas não sobrescrevem as antigas: se o modelo falhar,
+        # o cadastro anterior continua valendo
+        livres = caminhos_livres(pasta_usuario)
+        caminhos = []
+        try:
+            for amostra in amostras:
+                caminho_foto = next(livres)
+                if not cv2.imwrite(caminho_foto, amostra):
+                    raise OSError(f"Não foi possível gravar {caminho_foto}")
+                caminhos.append(caminho_foto)
+            self.galeria.add(nome, nivel, caminhos, substituir=True, vetores=vetores)
+        except Exception:
+            apagar_fotos(caminhos, pasta_usuario)
+            raise
+        self.catalogo.adicionar(nome, nivel, caminhos, substituir=True)
+        # Um cadastro novo substitui o antigo
+        novos = {os.path.normpath(c) for c in caminhos}
+        apagar_fotos([c for c in antigas if os.path.normpath(c) not in novos], pasta_usuario)
+        return caminhos
+
+    def remover(self, nome, nivel):
+        """Apaga as fotos do usuário (qualquer extensão) e tira do catálogo e da galeria;
+        devolve quantos arquivos saíram."""
+        validar_usuario(nome, nivel)
+        self.aguardar()
+        fotos = self.catalogo.remover(nome, nivel)
+        if not fotos:
+            return 0
+        apagados = apagar_fotos(fotos, os.path.join(self.db_path, nivel, nome))
+        self.galeria.remove(nome, nivel)
+        return apagados
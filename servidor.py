@@ -0,0 +1,169 @@
+import sys
+import hmac
+import json
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from config import SECURITY_KEY, CORPO_MAXIMO_SERVIDOR
+from cliente import decodificar_imagem
+from servico import ServicoReconhecimento
+from metricas import METRICAS
+from util import validar_usuario
+
+# ============================
+# Servidor de reconhecimento (HTTP/JSON local)
+# ============================
+#
+# Uso:
+#   python servidor.py                       (127.0.0.1:8765)
+#   python servidor.py --host 0.0.0.0 --porta 9000
+#
+# Um processo com o modelo carregado e a galeria em memória atende vários
+# terminais (front.py com SERVIDOR_RECONHECIMENTO apontando para cá).
+#
+# Rotas:
+#   GET  /saude                     -> {"pronto", "usuarios"}
+#   GET  /usuarios[?nivel=nivel_1][&limite=50&deslocamento=100]
+#                                   -> {"usuarios", "total"} (total do nível ou geral)
+#   GET  /metricas                  -> tempos e contadores (ver metricas.py)
+#   POST /identificar  {"itens": [{"imagem": jpg base64, "face": [x, y, w, h] ou null}]}
+#                                   -> {"resultados"}
+#   POST /cadastrar    {"nome", "nivel", "amostras": [jpg base64], "faces": [[x, y, w, h] ou null] ou null}
+#                                   (cabeçalho X-Chave)
+#   POST /remover      {"nome", "nivel"}                              (cabeçalho X-Chave)
+# Nome ou nível inválidos (ver util.validar_usuario) respondem 400; corpo acima
+# de CORPO_MAXIMO_SERVIDOR responde 413 sem ser lido.
+
+
+class CorpoGrandeDemais(ValueError):
+    pass
+
+
+class ManipuladorReconhecimento(BaseHTTPRequestHandler):
+    servico = None
+    protocol_version = "HTTP/1.1"
+
+    def _responder(self, status, dados):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _ler_json(self):
+        # Corpo recusado fica sem ler: a conexão não pode ser reaproveitada
+        fechar, self.close_connection = self.close_connection, True
+        texto = self.headers.get("Content-Length") or "0"
+        if not texto.isdigit():
+            raise ValueError(f"Content-Length inválido: {texto}")
+        tamanho = int(texto)
+        if tamanho > CORPO_MAXIMO_SERVIDOR:
+            raise CorpoGrandeDemais(f"Corpo com {tamanho} bytes; o máximo é {CORPO_MAXIMO_SERVIDOR}")
+        corpo = self.rfile.read(tamanho)
+        self.close_connection = fechar
+        return json.loads(corpo or b"{}")
+
+    def _autorizado(self):
+        # Comparação em tempo constante, para a chave não vazar pelo tempo de resposta
+        chave = self.headers.get("X-Chave", "").encode("utf-8")
+        return hmac.compare_digest(chave, SECURITY_KEY.encode("utf-8"))
+
+    def _tratar(self, funcao):
+        try:
+            self._responder(200, funcao())
+        except PermissionError as e:
+            self._responder(403, {"erro": str(e)})
+        except CorpoGrandeDemais as e:
+            self._responder(413, {"erro": str(e)})
+        except (ValueError, KeyError, TypeError) as e:
+            self._responder(400, {"erro": str(e)})
+        except Exception as e:
+            print(f"Erro em {self.path}: {e}")
+            self._responder(500, {"erro": str(e)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/saude":
+            self._tratar(lambda: {"pronto": self.servico.pronto(), "usuarios": self.servico.total_usuarios()})
+        elif url.path == "/metricas":
+            self._tratar(METRICAS.resumo)
+        elif url.path == "/usuarios":
+            self._tratar(lambda: self._usuarios(parse_qs(url.query)))
+        else:
+            self._responder(404, {"erro": f"Rota desconhecida: {url.path}"})
+
+    def do_POST(self):
+        rotas = {
+            "/identificar": self._identificar,
+            "/cadastrar": self._cadastrar,
+            "/remover": self._remover,
+        }
+        rota = rotas.get(urlparse(self.path).path)
+        if rota is None:
+            self._responder(404, {"erro": f"Rota desconhecida: {self.path}"})
+            return
+        self._tratar(lambda: rota(self._ler_json()))
+
+    def _usuarios(self, parametros):
+        nivel = parametros.get("nivel", [None])[0]
+        limite = parametros.get("limite", [None])[0]
+        limite = int(limite) if limite is not None else None
+        deslocamento = int(parametros.get("deslocamento", [0])[0])
+        usuarios = self.servico.usuarios(nivel, limite, deslocamento) if limite != 0 else []
+        return {"usuarios": usuarios, "total": self.servico.contar_usuarios(nivel)}
+
+    def _identificar(self, dados):
+        itens = dados["itens"]
+        imagens = [decodificar_imagem(item["imagem"]) for item in itens]
+        faces = [item.get("face") for item in itens]
+        return {"resultados": self.servico.identificar_lote(imagens, faces)}
+
+    def _cadastrar(self, dados):
+        if not self._autorizado():
+            raise PermissionError("Chave de segurança inválida")
+        validar_usuario(dados["nome"], dados["nivel"])
+        amostras = [decodificar_imagem(a) for a in dados["amostras"]]
+        return {"caminhos": self.servico.cadastrar(dados["nome"], dados["nivel"], amostras, dados.get("faces"))}
+
+    def _remover(self, dados):
+        if not self._autorizado():
+            raise PermissionError("Chave de segurança inválida")
+        validar_usuario(dados["nome"], dados["nivel"])
+        return {"apagados": self.servico.remover(dados["nome"], dados["nivel"])}
+
+    def log_message(self, formato, *args):
+        # Sem uma linha por requisição no terminal
+        pass
+
+
+def criar_servidor(servico, host="127.0.0.1", porta=8765):
+    manipulador = type("Manipulador", (ManipuladorReconhecimento,), {"servico": servico})
+    servidor = ThreadingHTTPServer((host, porta), manipulador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de reconhecimento facial compartilhado.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    servico = ServicoReconhecimento()
+    servico.aguardar()
+    servidor = criar_servidor(servico, args.host, args.porta)
+    print(f"Servidor de reconhecimento em http://{args.host}:{args.porta} "
+          f"({servico.total_usuarios()} usuários na galeria)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
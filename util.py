@@ -0,0 +1,28 @@
+import os
+import unicodedata
+
+from config import NIVEIS
+
+# ============================
+# Funções auxiliares
+# ============================
+
+def normalizar_nome(texto):
+    texto = ''.join(
+        c for c in unicodedata.normalize('NFKD', texto)
+        if not unicodedata.combining(c)
+    )
+    texto = texto.replace(" ", "_").lower()
+    return texto
+
+
+def validar_usuario(nome, nivel):
+    """Levanta ValueError se ``nome`` não for um único componente de caminho
+    (usuarios/<nível>/<nome>) ou se ``nivel`` não for um dos NIVEIS."""
+    if nivel not in NIVEIS:
+        raise ValueError(f"Nível inválido: {nivel!r}")
+    if not isinstance(nome, str) or nome.strip() in ("", ".", ".."):
+        raise ValueError(f"Nome inválido: {nome!r}")
+    separadores = {"/", "\\", os.sep, os.altsep} - {None}
+    if any(s in nome for s in separadores) or "\0" in nome or os.path.isabs(nome) or os.path.splitdrive(nome)[0]:
+        raise ValueError(f"Nome inválido: {nome!r}")